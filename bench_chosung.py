@@ -0,0 +1,71 @@
+"""get_chosung 마이크로 벤치마크 (기준 커밋 c5b78dd의 구현 vs 변환표 + 캐시)
+
+    python bench_chosung.py
+"""
+import os
+import random
+import timeit
+
+os.environ.setdefault("BOT_TOKEN", "bench")
+import bot  # noqa: E402
+
+# ── 기준 구현 (c5b78dd 그대로: 'ㄱ'~'ㅎ' 자모 30자를 초성표로 써서 ㄱ/ㄲ 이후 결과가 틀림) ──
+OLD_CHOSUNG_LIST = [chr(code) for code in range(ord('ㄱ'), ord('ㅎ') + 1)]
+
+def get_chosung_old(text: str) -> str:
+    """한글 문자열을 초성 문자열로 변환합니다. 예: '가위바위보' -> 'ㄱㅂㅂ'"""
+    def is_hangul(char):
+        return '가' <= char <= '힣'
+
+    result = ''
+    for char in text:
+        if not is_hangul(char):
+            result += char
+            continue
+        code = ord(char) - ord('가')
+        chosung_index = code // 588
+        result += OLD_CHOSUNG_LIST[chosung_index]
+    return result
+
+def make_names(n, seed=0):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(n):
+        length = rng.randint(2, 12)
+        names.append("".join(
+            chr(rng.randint(0xAC00, 0xD7A3)) if rng.random() < 0.8 else rng.choice("abc123 _")
+            for _ in range(length)
+        ))
+    return names
+
+def main():
+    names = make_names(5000)
+    wrong = sum(get_chosung_old(n) != bot.get_chosung.__wrapped__(n) for n in names)
+
+    def cold():
+        bot.get_chosung.cache_clear()
+        for n in names:
+            bot.get_chosung(n)
+
+    hot = names[:1000] * 5   # 캐시 크기 안에서 반복되는 입력 (닉네임/명령어 등)
+
+    def warm():
+        for n in hot:
+            bot.get_chosung(n)
+
+    cases = [
+        ("baseline (c5b78dd)", lambda: [get_chosung_old(n) for n in names]),
+        ("translate, no cache", lambda: [bot.get_chosung.__wrapped__(n) for n in names]),
+        ("translate + lru (cold)", cold),
+        ("translate + lru (hot set)", warm),
+    ]
+    repeat = 20
+    base = None
+    print(f"{len(names)} names × {repeat} rounds (기준 구현 결과가 다른 이름: {wrong}개)")
+    for label, fn in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=repeat))
+        base = base or best
+        print(f"{label:<26} {best * 1e3:8.2f} ms/batch  {best / len(names) * 1e6:6.2f} µs/name  x{base / best:5.1f}")
+
+if __name__ == "__main__":
+    main()
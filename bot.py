@@ -7,7 +7,17 @@ import datetime
 import time
 import asyncio
 import re
+import bisect
+import math
+import copy
+import functools
+import contextlib
+import signal
+import sqlite3
+import traceback
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
 
 import discord
 from discord.ext import commands
@@ -21,24 +31,19 @@ TALENT_STORE_FILE = os.path.join(BASE_DIR, "talent_store.json")
 DEFAULT_DATA = {"user_points": {}}
 
 # ───── Constants ─────
-CHOSUNG_LIST = [chr(code) for code in range(ord('ㄱ'), ord('ㅎ') + 1)]
+# 유니코드 한글 음절의 초성 순서 (19자) – 음절 코드 // 588 이 이 목록의 인덱스
+CHOSUNG_LIST = list("ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ")
 
+# 한글 음절 블록(가~힣, 11172자) → 초성 변환표. 음절이 아닌 문자는 그대로 둠
+_HANGUL_BASE = ord('가')
+_CHOSUNG_TABLE = {code: CHOSUNG_LIST[(code - _HANGUL_BASE) // 588] for code in range(_HANGUL_BASE, ord('힣') + 1)}
+
+@functools.lru_cache(maxsize=4096)
 def get_chosung(text: str) -> str:
-    """한글 문자열을 초성 문자열로 변환합니다. 예: '가위바위보' -> 'ㄱㅂㅂ'"""
-    def is_hangul(char):
-        return '가' <= char <= '힣'
-    
-    result = ''
-    for char in text:
-        if not is_hangul(char):
-            result += char
-            continue
-        code = ord(char) - ord('가')
-        chosung_index = code // 588
-        result += CHOSUNG_LIST[chosung_index]
-    return result
+    """한글 문자열을 초성 문자열로 변환합니다. 예: '가위바위보' -> 'ㄱㅇㅂㅇㅂ'"""
+    return text.translate(_CHOSUNG_TABLE)
 
-# ───── 초성 → 명령어 매핑 ─────
+# ───── 초성 → 명령어 매핑 (자동 초성 별칭보다 우선하는 수동 지정) ─────
 초성명령어 = {
     "ㅊㅅ": "출석",
     "ㅍㅇㅌ": "포인트",
@@ -70,40 +75,1236 @@ DEFAULT_DATA = {
     "beg_log": {},
     "usernames": {},
     "inventory": {},
-    "user_join_times": {},         
-    "user_mic_history": {} 
+    "voice_sessions": {},
+    "voice_pending": {},
+    "talent_store": {},
+    "slot_quiet_channels": {},     # 슬롯 연출을 끈 채널
+    "slot_jackpots": {},           # 서버별 잭팟 적립액 {guild_id: 누적 베팅액}
+    "escrow_holds": {}             # 진행 중인 게임에 묶인 판돈 {hold_id: {uid: 금액}}
 }
 
-# ───── JSON 읽기/쓰기 ─────
-def read_data():
-    if not os.path.exists(DATA_FILE):
-        return DEFAULT_DATA.copy()
+# !초기화가 건드리지 않는 섹션: 예전 data.json 밖에 있던 재능상점, 채널 설정, 진행 중인 음성 세션/게임 판돈
+RESET_EXEMPT_SECTIONS = frozenset({
+    "talent_store", "slot_quiet_channels", "voice_sessions", "voice_pending", "escrow_holds",
+})
+
+# ───── 출석/구걸 기록 (압축 형식) ─────
+# checkin_log[uid] = {"first": 첫 출석일, "bits": 일자별 출석 비트(16진수), "total": 누적 일수, "last": 마지막 출석일}
+#   → bit i는 first + i일의 출석 여부. 오늘/어제 출석 확인은 last 비교로 O(1)
+# beg_log[uid] = {"YYYY-MM-DD": 횟수} → 최근 BEG_LOG_KEEP_DAYS일만 남기고 자동 정리
+BEG_LOG_KEEP_DAYS = 7
+
+def _day_number(day: str) -> int:
+    return datetime.date.fromisoformat(day).toordinal()
+
+def mark_checkin(rec: dict | None, day: str) -> dict:
+    """출석 기록에 day를 추가한 새 기록을 돌려줍니다."""
+    if not rec:
+        return {"first": day, "bits": "1", "total": 1, "last": day}
+    offset = _day_number(day) - _day_number(rec["first"])
+    bits = int(rec["bits"], 16)
+    if bits >> offset & 1:
+        return rec
+    return {
+        "first": rec["first"],
+        "bits": format(bits | 1 << offset, "x"),
+        "total": rec["total"] + 1,
+        "last": max(rec["last"], day),
+    }
+
+def count_beg(counts: dict | None, day: str) -> dict:
+    """오늘 구걸 횟수를 1 올리고 오래된 날짜는 정리한 새 기록을 돌려줍니다."""
+    cutoff = (datetime.date.fromisoformat(day) - datetime.timedelta(days=BEG_LOG_KEEP_DAYS - 1)).isoformat()
+    kept = {d: c for d, c in (counts or {}).items() if d >= cutoff}
+    kept[day] = kept.get(day, 0) + 1
+    return kept
+
+def migrate_legacy_logs(data) -> list[tuple[str, str, object]]:
+    """예전 날짜 문자열 리스트 형식의 출석/구걸 기록을 압축 형식으로 바꿀 (섹션, uid, 값) 목록"""
+    changes = []
+    for uid, days in data.get("checkin_log", {}).items():
+        if isinstance(days, list):
+            rec = None
+            for day in sorted(set(days)):
+                rec = mark_checkin(rec, day)
+            changes.append(("checkin_log", uid, rec))
+    for uid, days in data.get("beg_log", {}).items():
+        if isinstance(days, list):
+            counts = {}
+            for day in days:
+                counts[day] = counts.get(day, 0) + 1
+            if counts:
+                latest = max(counts)
+                cutoff = (datetime.date.fromisoformat(latest) - datetime.timedelta(days=BEG_LOG_KEEP_DAYS - 1)).isoformat()
+                counts = {d: c for d, c in counts.items() if d >= cutoff}
+            changes.append(("beg_log", uid, counts))
+    return changes
+
+# ───── 저장소 백엔드 ─────
+# 모든 변경은 {"o": add|set|del, "k": 섹션, "u": uid 또는 None(최상위 값), "v": 값, "s": 번호} 형태의 op로 기록됩니다.
+# 백엔드는 DataStore의 단일 I/O 스레드에서만 호출되므로 자체 잠금이 필요 없습니다.
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")   # json | sqlite
+JOURNAL_FILE = os.path.join(BASE_DIR, "data.journal")
+SQLITE_FILE = os.path.join(BASE_DIR, "data.db")
+
+def _with_defaults(data):
+    for key in DEFAULT_DATA:
+        data.setdefault(key, copy.deepcopy(DEFAULT_DATA[key]))
+    return data
+
+def _atomic_write(path, text):
+    """임시 파일에 쓰고 fsync 후 rename → 도중에 죽어도 이전 파일이 그대로 남음"""
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            for key in DEFAULT_DATA:
-                data.setdefault(key, DEFAULT_DATA[key])
-            return data
-    except:
-        return DEFAULT_DATA.copy()
-
-def write_data(data):
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-# ───── 재능상점 데이터 I/O ─────
-def load_talent_store():
-    if not os.path.exists(TALENT_STORE_FILE):
-        return {}
+        fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    except OSError:
+        return  # 디렉터리 fsync 미지원 환경
     try:
-        with open(TALENT_STORE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _apply_op(data, op):
+    """op 하나를 데이터에 반영 (실행 중 변경과 재시작 복구가 같은 경로를 사용)"""
+    kind, key, uid, value = op["o"], op["k"], op.get("u"), op.get("v")
+    if uid is None:
+        if kind == "add":
+            data[key] = data.get(key, 0) + value
+        elif kind == "set":
+            data[key] = value
+        return data.get(key)
+    section = data.setdefault(key, {})
+    if kind == "add":
+        section[uid] = section.get(uid, 0) + value
+    elif kind == "set":
+        section[uid] = value
+    elif kind == "del":
+        section.pop(uid, None)
+    return section.get(uid)
+
+def _load_legacy_talent_store():
+    if not os.path.exists(TALENT_STORE_FILE):
         return {}
+    with open(TALENT_STORE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+class JsonBackend:
+    """data.json 스냅샷 + data.journal 저널.
+
+    저널은 변경마다 한 줄씩 추가하고 fsync하며, 스냅샷은 임시 파일 + rename으로 원자적으로 교체합니다.
+    재시작 시에는 마지막 스냅샷 위에 그 이후의 저널을 다시 적용해 복구합니다.
+    """
+    snapshots = True
+
+    def __init__(self, path=DATA_FILE, journal_path=JOURNAL_FILE):
+        self.path = path
+        self.journal_path = journal_path
+        self._journal = None
+
+    def load(self):
+        """(데이터, 마지막 op 번호, 다시 적용한 저널 수)를 돌려줍니다."""
+        data = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                try:
+                    data = json.load(f)
+                except ValueError as e:
+                    raise RuntimeError(f"❗ {self.path} 파일이 손상되어 실행을 중단합니다. (기본값으로 덮어쓰지 않음)") from e
+        seq = data.pop("_seq", 0)
+        replayed = 0
+        if "talent_store" not in data:
+            data["talent_store"] = _load_legacy_talent_store()  # 예전 talent_store.json 1회 흡수
+            replayed += bool(data["talent_store"])
+        for op in self._read_journal():
+            if op["s"] <= seq:
+                continue  # 이미 스냅샷에 포함된 변경
+            _apply_op(data, op)
+            seq = op["s"]
+            replayed += 1
+        return _with_defaults(data), seq, replayed
+
+    def _read_journal(self):
+        """저널의 op를 순서대로 읽습니다.
+
+        기록 도중 끊긴 마지막 줄(줄바꿈 없음)은 그 앞까지 파일을 잘라 냅니다. 그대로 두면 이후 커밋이
+        같은 줄 뒤에 이어 붙어 다음 복구 때 읽을 수 없게 됩니다.
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        good = 0   # 마지막으로 온전히 읽은 줄 끝의 바이트 위치
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                good += len(line)
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    print(f"❗ 저널에서 읽을 수 없는 줄을 건너뜁니다: {line[:80]!r}")
+                    continue
+                yield op
+            else:
+                return
+        print(f"❗ 끊긴 저널 끝부분({os.path.getsize(self.journal_path) - good}바이트)을 잘라 냅니다.")
+        os.truncate(self.journal_path, good)
+
+    def commit(self, ops):
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.writelines(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def checkpoint(self, payload):
+        # I/O는 단일 스레드에서 순서대로 실행되므로, 여기까지 파일에 기록된 저널은
+        # 모두 이 스냅샷의 _seq 이하 → 스냅샷이 자리 잡은 뒤 저널을 비워도 안전
+        _atomic_write(self.path, payload)
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.truncate(0)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def close(self):
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+class SqliteBackend:
+    """SQLite(WAL) 백엔드. 자주 쓰는 섹션은 전용 테이블에, 나머지는 kv 테이블에 JSON으로 저장합니다.
+
+    한 번의 commit()이 트랜잭션 하나이므로 그룹 커밋이 그대로 적용되고, 별도 스냅샷은 필요 없습니다.
+    DB가 비어 있으면 처음 열 때 data.json(+저널) / talent_store.json을 한 번 옮겨 옵니다.
+    """
+    snapshots = False
+    USER_COLUMNS = ("user_points", "activity_xp", "admin_xp", "gamble_points", "gamble_losses", "streak_log")
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            uid           TEXT PRIMARY KEY,
+            user_points   INTEGER,
+            activity_xp   INTEGER,
+            admin_xp      INTEGER,
+            gamble_points INTEGER,
+            gamble_losses INTEGER,
+            streak_log    INTEGER,
+            username      TEXT
+        );
+        CREATE TABLE IF NOT EXISTS checkin_stats (
+            uid       TEXT PRIMARY KEY,
+            first_day TEXT NOT NULL,
+            bits      TEXT NOT NULL,
+            total     INTEGER NOT NULL,
+            last_day  TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS begs (
+            uid   TEXT NOT NULL,
+            day   TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (uid, day)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS talent_items (
+            seller_id TEXT NOT NULL,
+            pos       INTEGER NOT NULL,
+            name      TEXT NOT NULL,
+            price     INTEGER NOT NULL,
+            registered_at REAL NOT NULL,
+            PRIMARY KEY (seller_id, pos)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS kv (
+            section TEXT NOT NULL,
+            key     TEXT NOT NULL,
+            value   TEXT NOT NULL,
+            PRIMARY KEY (section, key)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS meta (
+            key   TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        self.db = None
+
+    def _connect(self):
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=FULL")
+            self.db.executescript(self.SCHEMA)
+        return self.db
+
+    def _meta(self, key, default=None):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def load(self):
+        db = self._connect()
+        migrated = 0
+        if self._meta("seq") is None:
+            migrated = self._migrate_from_json()
+        data = {}
+        for row in db.execute(f"SELECT uid, {', '.join(self.USER_COLUMNS)}, username FROM users"):
+            uid = row[0]
+            for key, value in zip(self.USER_COLUMNS + ("usernames",), row[1:]):
+                if value is not None:
+                    data.setdefault(key, {})[uid] = value
+        for uid, first, bits, total, last in db.execute("SELECT uid, first_day, bits, total, last_day FROM checkin_stats"):
+            data.setdefault("checkin_log", {})[uid] = {"first": first, "bits": bits, "total": total, "last": last}
+        for uid, day, count in db.execute("SELECT uid, day, count FROM begs"):
+            data.setdefault("beg_log", {}).setdefault(uid, {})[day] = count
+        for seller_id, name, price, at in db.execute(
+            "SELECT seller_id, name, price, registered_at FROM talent_items ORDER BY seller_id, pos"
+        ):
+            data.setdefault("talent_store", {}).setdefault(seller_id, {"items": []})["items"].append(
+                {"name": name, "price": price, "at": at}
+            )
+        for section, key, value in db.execute("SELECT section, key, value FROM kv"):
+            if key == "":
+                data[section] = json.loads(value)
+            else:
+                data.setdefault(section, {})[key] = json.loads(value)
+        return _with_defaults(data), int(self._meta("seq", 0)), migrated
+
+    def _migrate_from_json(self):
+        """기존 JSON 데이터를 op로 풀어서 한 트랜잭션으로 옮깁니다 (최초 1회)"""
+        if not os.path.exists(DATA_FILE) and not os.path.exists(TALENT_STORE_FILE):
+            self.commit([])
+            return 0
+        data, seq, _ = JsonBackend(DATA_FILE, JOURNAL_FILE).load()
+        # 예전 data.json의 리스트 형식 출석/구걸 기록은 _apply가 받는 압축 형식으로 먼저 바꿔 둠
+        for key, uid, value in migrate_legacy_logs(data):
+            data[key][uid] = value
+        ops = [{"o": "set", "k": key, "u": None, "v": value, "s": seq} for key, value in data.items()]
+        self.commit(ops)
+        print(f"💾 data.json / talent_store.json → {os.path.basename(self.path)} 이전 완료")
+        return len(ops)
+
+    def commit(self, ops):
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for op in ops:
+                self._apply(db, op)
+            if ops:
+                db.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('seq', ?)", (str(ops[-1]["s"]),))
+            elif self._meta("seq") is None:
+                db.execute("INSERT INTO meta(key, value) VALUES ('seq', '0')")
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _apply(self, db, op):
+        kind, key, uid, value = op["o"], op["k"], op.get("u"), op.get("v")
+        if uid is None and kind == "set" and isinstance(value, dict):
+            # 섹션 전체 교체 (초기화/이전): 비운 뒤 항목별 set으로 다시 채움
+            self._clear(db, key)
+            for sub_uid, sub_value in value.items():
+                self._apply(db, {"o": "set", "k": key, "u": sub_uid, "v": sub_value})
+            return
+        if key in self.USER_COLUMNS:
+            if kind == "del":
+                db.execute(f"UPDATE users SET {key} = NULL WHERE uid = ?", (uid,))
+                return
+            expr = f"COALESCE({key}, 0) + excluded.{key}" if kind == "add" else f"excluded.{key}"
+            db.execute(
+                f"INSERT INTO users(uid, {key}) VALUES (?, ?) ON CONFLICT(uid) DO UPDATE SET {key} = {expr}",
+                (uid, value),
+            )
+        elif key == "usernames":
+            db.execute(
+                "INSERT INTO users(uid, username) VALUES (?, ?) ON CONFLICT(uid) DO UPDATE SET username = excluded.username",
+                (uid, value if kind == "set" else None),
+            )
+        elif key == "checkin_log":
+            if kind == "set" and isinstance(value, dict):
+                db.execute(
+                    "INSERT OR REPLACE INTO checkin_stats(uid, first_day, bits, total, last_day) VALUES (?, ?, ?, ?, ?)",
+                    (uid, value["first"], value["bits"], value["total"], value["last"]),
+                )
+            else:
+                db.execute("DELETE FROM checkin_stats WHERE uid = ?", (uid,))
+        elif key == "beg_log":
+            db.execute("DELETE FROM begs WHERE uid = ?", (uid,))
+            if kind == "set":
+                db.executemany("INSERT INTO begs(uid, day, count) VALUES (?, ?, ?)", [(uid, d, c) for d, c in value.items()])
+        elif key == "talent_store":
+            db.execute("DELETE FROM talent_items WHERE seller_id = ?", (uid,))
+            if kind == "set":
+                db.executemany(
+                    "INSERT INTO talent_items(seller_id, pos, name, price, registered_at) VALUES (?, ?, ?, ?, ?)",
+                    [(uid, pos, it["name"], it["price"], it.get("at", 0)) for pos, it in enumerate(value["items"])],
+                )
+        else:
+            row_key = "" if uid is None else uid
+            if kind == "del":
+                db.execute("DELETE FROM kv WHERE section = ? AND key = ?", (key, row_key))
+            elif kind == "add":
+                db.execute(
+                    "INSERT INTO kv(section, key, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT(section, key) DO UPDATE SET value = CAST(value AS INTEGER) + CAST(excluded.value AS INTEGER)",
+                    (key, row_key, str(value)),
+                )
+            else:
+                db.execute(
+                    "INSERT OR REPLACE INTO kv(section, key, value) VALUES (?, ?, ?)",
+                    (key, row_key, json.dumps(value, ensure_ascii=False)),
+                )
 
-def save_talent_store(store):
-    with open(TALENT_STORE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(store, f, indent=2, ensure_ascii=False)
+    def _clear(self, db, key):
+        if key in self.USER_COLUMNS:
+            db.execute(f"UPDATE users SET {key} = NULL")
+        elif key == "usernames":
+            db.execute("UPDATE users SET username = NULL")
+        elif key == "checkin_log":
+            db.execute("DELETE FROM checkin_stats")
+        elif key == "beg_log":
+            db.execute("DELETE FROM begs")
+        elif key == "talent_store":
+            db.execute("DELETE FROM talent_items")
+        else:
+            db.execute("DELETE FROM kv WHERE section = ?", (key,))
+
+    def checkpoint(self, payload=None):
+        self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        if self.db:
+            self.db.close()
+            self.db = None
+
+def make_backend(name=STORAGE_BACKEND):
+    backends = {"json": JsonBackend, "sqlite": SqliteBackend}
+    if name not in backends:
+        raise ValueError(f"❗ 알 수 없는 STORAGE_BACKEND: {name} (json | sqlite)")
+    return backends[name]()
+
+# ───── 인메모리 데이터 저장소 ─────
+JOURNAL_COMMIT_DELAY = 0.05   # 그룹 커밋: 이 시간 동안 모인 변경을 한 번에 기록(초)
+SNAPSHOT_INTERVAL = 60.0      # 첫 변경 이후 압축 스냅샷/체크포인트까지 기다리는 시간(초)
+
+class DataStore:
+    """시작 시 백엔드에서 한 번만 읽고, 이후 조회는 모두 메모리에서 처리하는 전역 저장소.
+
+    모든 변경은 add()/set()/delete()로 메모리에 바로 반영되고 op로 쌓입니다.
+    쌓인 op는 JOURNAL_COMMIT_DELAY 동안 모아 백엔드에 한 번에 커밋하고(그룹 커밋),
+    SNAPSHOT_INTERVAL마다 백엔드 체크포인트(JSON은 전체 스냅샷, SQLite는 WAL 체크포인트)를 실행합니다.
+    백엔드 I/O는 전용 스레드 하나에서 순서대로 실행되어 이벤트 루프를 막지 않습니다.
+    """
+    # 유저별 렌더 캐시(포인트/출석현황)가 읽는 섹션 – 이 섹션의 변경만 user_versions를 올림
+    VERSIONED_SECTIONS = frozenset({
+        "user_points", "activity_xp", "admin_xp", "gamble_points", "checkin_log", "streak_log",
+    })
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.data: dict = {}
+        self.dirty: set[str] = set()
+        self.seq = 0               # 마지막으로 발급한 op 번호
+        self.committed_seq = 0     # 백엔드에 커밋까지 끝난 op 번호
+        self._pending: list[dict] = []
+        self._watchers: dict[str, list] = {}
+        self.generation = 0                      # 섹션 전체 교체(로드/초기화)마다 증가
+        self.user_versions: dict[str, int] = {}  # uid별 VERSIONED_SECTIONS 변경 횟수 (렌더 캐시 키)
+        self._waiters: list[tuple[int, asyncio.Future]] = []
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-io")
+        self._commit_task: asyncio.Task | None = None
+        self._snapshot_task: asyncio.Task | None = None
+        self.commit_count = 0
+        self.last_commit_ms = 0.0
+        self.flush_count = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    # ── 시작 / 종료 ──
+    def load(self):
+        if self.backend is None:
+            self.backend = make_backend()
+        self.data, self.seq, replayed = self._io.submit(self.backend.load).result()
+        legacy = migrate_legacy_logs(self.data)
+        for key, uid, value in legacy:
+            self.set(key, uid, value)
+        replayed += len(legacy)
+        self.committed_seq = self.seq
+        self.generation += 1
+        self.dirty.clear()
+        for key, callbacks in self._watchers.items():
+            for callback in callbacks:
+                callback(None, self.data.get(key))
+        if replayed:
+            print(f"💾 변경 {replayed}건을 다시 적용했습니다.")
+            self.dirty.add("_recovered")
+            self.flush()  # 복구 결과를 새 스냅샷으로 압축
+
+    def flush(self):
+        """남은 op와 스냅샷을 즉시 동기 저장 (시작 복구/종료 시 사용)"""
+        for task in (self._commit_task, self._snapshot_task):
+            if task and not task.done():
+                task.cancel()
+        if self._pending:
+            ops, self._pending = self._pending, []
+            self._io.submit(self.backend.commit, ops).result()
+            self.committed_seq = self.seq
+        if not self.dirty:
+            return
+        started = time.perf_counter()
+        payload = self._snapshot()
+        self._io.submit(self.backend.checkpoint, payload).result()
+        self._record(started)
+
+    def close(self):
+        self.flush()
+        self._io.submit(self.backend.close).result()
+
+    # ── 변경 API ──
+    def watch(self, key, callback):
+        """key 섹션이 바뀔 때마다 callback(uid, 새 값)을 호출 (uid가 None이면 섹션 전체가 교체됨)"""
+        self._watchers.setdefault(key, []).append(callback)
+
+    def get(self, key, uid=None, default=0):
+        if uid is None:
+            return self.data.get(key, default)
+        return self.data.get(key, {}).get(uid, default)
+
+    def add(self, key, uid, delta):
+        """숫자 값에 delta를 더하고 새 값을 돌려줍니다. uid가 None이면 최상위 값."""
+        return self._log({"o": "add", "k": key, "u": uid, "v": delta})
+
+    def set(self, key, uid, value):
+        return self._log({"o": "set", "k": key, "u": uid, "v": value})
+
+    def delete(self, key, uid):
+        self._log({"o": "del", "k": key, "u": uid})
+
+    def reset(self):
+        """포인트/통계 섹션만 기본값으로 되돌립니다 (RESET_EXEMPT_SECTIONS는 유지)"""
+        for key, value in DEFAULT_DATA.items():
+            if key not in RESET_EXEMPT_SECTIONS:
+                self.set(key, None, copy.deepcopy(value))
+
+    async def sync(self):
+        """지금까지의 변경이 백엔드에 커밋될 때까지 기다립니다."""
+        target = self.seq
+        if self.committed_seq >= target:
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((target, fut))
+        await fut
+
+    def version(self, uid) -> tuple[int, int]:
+        """uid 데이터의 버전 – 이 유저의 값이 바뀌거나 섹션이 통째로 바뀌면 달라짐"""
+        return self.generation, self.user_versions.get(uid, 0)
+
+    def _log(self, op):
+        result = _apply_op(self.data, op)
+        if op["u"] is not None:
+            if op["k"] in self.VERSIONED_SECTIONS:
+                self.user_versions[op["u"]] = self.user_versions.get(op["u"], 0) + 1
+        elif op["o"] != "add":
+            self.generation += 1
+        for callback in self._watchers.get(op["k"], ()):
+            callback(op["u"], result)
+        self.seq += 1
+        op["s"] = self.seq
+        if isinstance(op.get("v"), (dict, list)):
+            # I/O 스레드가 나중에 읽으므로 이후 메모리 수정이 섞이지 않게 복사해 둠
+            op["v"] = copy.deepcopy(op["v"])
+        self._pending.append(op)
+        self.dirty.add(op["k"])
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return result  # 이벤트 루프 밖에서는 flush()가 직접 기록
+        if not self._commit_task or self._commit_task.done():
+            self._commit_task = loop.create_task(self._commit_loop())
+        if not self._snapshot_task or self._snapshot_task.done():
+            self._snapshot_task = loop.create_task(self._delayed_snapshot())
+        return result
+
+    # ── 그룹 커밋 ──
+    async def _commit_loop(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            await asyncio.sleep(JOURNAL_COMMIT_DELAY)
+            ops, self._pending = self._pending, []
+            upto = self.seq
+            started = time.perf_counter()
+            try:
+                await loop.run_in_executor(self._io, self.backend.commit, ops)
+            except (OSError, sqlite3.Error) as e:
+                print(f"❗ 변경 기록 실패: {e}")
+                self._pending[:0] = ops
+                continue
+            self.commit_count += 1
+            self.last_commit_ms = (time.perf_counter() - started) * 1000
+            self.committed_seq = upto
+            remaining = []
+            for target, fut in self._waiters:
+                if target <= upto:
+                    if not fut.done():
+                        fut.set_result(None)
+                else:
+                    remaining.append((target, fut))
+            self._waiters = remaining
+
+    # ── 스냅샷(압축) ──
+    async def _delayed_snapshot(self):
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        if not self.dirty:
+            return
+        started = time.perf_counter()
+        keys = set(self.dirty)
+        # 직렬화는 루프 스레드에서 끝내야 저장 도중 다른 명령어의 수정과 섞이지 않음
+        payload = self._snapshot()
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._io, self.backend.checkpoint, payload)
+        except (OSError, sqlite3.Error) as e:
+            self.dirty |= keys
+            print(f"❗ 스냅샷 저장 실패: {e}")
+            return
+        self._record(started)
+
+    def _snapshot(self):
+        self.dirty.clear()
+        if not self.backend.snapshots:
+            return None
+        return json.dumps({**self.data, "_seq": self.seq}, ensure_ascii=False)
+
+    def _record(self, started):
+        elapsed = (time.perf_counter() - started) * 1000
+        self.flush_count += 1
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        self.total_flush_ms += elapsed
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "dirty": len(self.dirty),
+            "journal_pending": len(self._pending),
+            "commits": self.commit_count,
+            "commit_ms": self.last_commit_ms,
+            "flushes": self.flush_count,
+            "last_ms": self.last_flush_ms,
+            "avg_ms": self.total_flush_ms / self.flush_count if self.flush_count else 0.0,
+            "max_ms": self.max_flush_ms,
+        }
+
+store = DataStore()
+
+# ───── 포인트 원장 ─────
+class Ledger:
+    """user_points 증감을 한 곳에서 처리하는 원장.
+
+    같은 유저의 변경만 유저별 asyncio.Lock으로 직렬화하므로, 서로 다른 유저의 명령어는 그대로 병렬로 진행됩니다.
+    여러 유저를 함께 잠글 때는 항상 uid 순서로 잡아 교착을 막습니다.
+    stats에는 잔액과 함께 올릴 통계 값(activity_xp 등)을 {섹션: 증감} 형태로 넘깁니다.
+    에스크로(멀티플레이 판돈)는 escrow_holds 섹션에 기록되어, 차감과 묶기·해제와 지급이 각각 같은 커밋에 들어갑니다.
+    """
+
+    def __init__(self, store: DataStore):
+        self.store = store
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._lock_refs: dict[str, int] = {}
+
+    @contextlib.asynccontextmanager
+    async def locked(self, *uids: str):
+        keys = sorted(set(uids))
+        for uid in keys:
+            self._lock_refs[uid] = self._lock_refs.get(uid, 0) + 1
+        locks = [self._locks.setdefault(uid, asyncio.Lock()) for uid in keys]
+        acquired = []
+        try:
+            for lock in locks:
+                await lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in acquired:
+                lock.release()
+            for uid in keys:
+                self._lock_refs[uid] -= 1
+                if not self._lock_refs[uid]:  # 기다리는 쪽이 없으면 잠금 객체도 정리
+                    del self._lock_refs[uid]
+                    del self._locks[uid]
+
+    def balance(self, uid: str) -> int:
+        return self.store.get("user_points", uid)
+
+    def _credit(self, uid, amount, stats):
+        balance = self.store.add("user_points", uid, amount)
+        for key, delta in (stats or {}).items():
+            self.store.add(key, uid, delta)
+        return balance
+
+    async def credit(self, uid: str, amount: int, stats: dict | None = None) -> int:
+        async with self.locked(uid):
+            balance = self._credit(uid, amount, stats)
+        await self.store.sync()
+        return balance
+
+    def credit_many_nowait(self, amounts: dict[str, int], stats_keys: tuple[str, ...] = ()):
+        """여러 유저에게 한 번에 지급 (stats_keys 섹션에도 같은 금액을 더함).
+        잠금/커밋 대기는 호출하는 쪽 몫입니다 – locked() 안에서 부르거나, 이벤트 루프 밖의 종료 처리에서만 씁니다."""
+        for uid, amount in amounts.items():
+            self._credit(uid, amount, {key: amount for key in stats_keys})
+
+    async def wager(self, uid: str, stake: int, resolve, stats=None):
+        """stake를 걸 수 있으면 resolve()로 (결과, 지급액)을 정하고 차감과 지급을 한 번의 증감으로 반영합니다.
+
+        resolve는 잠금 안에서 바로(await 없이) 실행되므로 결과 확정과 잔액 반영 사이에 다른 명령이 끼지 않습니다.
+        stats가 함수면 stats(결과, 지급액)으로 결과에 따른 통계 증감을 받습니다 (같은 커밋에 기록).
+        잔액이 부족하면 None, 아니면 (결과, 새 잔액)을 돌려줍니다.
+        """
+        async with self.locked(uid):
+            if self.balance(uid) < stake:
+                return None
+            outcome, payout = resolve()
+            if callable(stats):
+                stats = stats(outcome, payout)
+            balance = self._credit(uid, payout - stake, stats)
+        await self.store.sync()
+        return outcome, balance
+
+    async def transfer(self, src: str, dst: str, amount: int) -> bool:
+        async with self.locked(src, dst):
+            if self.balance(src) < amount:
+                return False
+            self.store.add("user_points", src, -amount)
+            self.store.add("user_points", dst, amount)
+        await self.store.sync()
+        return True
+
+    async def escrow(self, hold_id: str, stakes: dict[str, int]) -> str | None:
+        """참가자 전원의 판돈을 한 번에 묶습니다. 한 명이라도 부족하면 아무도 차감하지 않고 그 uid를 돌려줍니다.
+        같은 hold_id로 다시 부르면 기존 에스크로에 더해집니다 (경마 배팅처럼 판돈이 하나씩 들어올 때).
+        판돈은 1 이상이어야 합니다 (0 이하를 묶으면 정산 때 포인트가 생기거나 잔액이 음수가 됨)."""
+        bad = [uid for uid, amount in stakes.items() if amount <= 0]
+        if bad:
+            raise ValueError(f"에스크로 판돈은 1 이상이어야 합니다: {bad}")
+        async with self.locked(*stakes):
+            for uid, amount in stakes.items():
+                if self.balance(uid) < amount:
+                    return uid
+            hold = dict(self.holding(hold_id))
+            for uid, amount in stakes.items():
+                self.store.add("user_points", uid, -amount)
+                hold[uid] = hold.get(uid, 0) + amount
+            self.store.set("escrow_holds", hold_id, hold)
+        await self.store.sync()
+        return None
+
+    def holding(self, hold_id: str) -> dict[str, int]:
+        return self.store.get("escrow_holds", hold_id, {})
+
+    async def release(self, hold_id: str, payouts: dict[str, int]):
+        """묶어 둔 판돈을 payouts대로 지급하고 에스크로를 닫습니다. 이미 닫힌 에스크로면 아무것도 하지 않습니다."""
+        await self._close(hold_id, payouts)
+
+    async def refund(self, hold_id: str):
+        """묶어 둔 판돈을 낸 사람에게 그대로 돌려줍니다 (취소/시간 초과/오류 시)."""
+        await self._close(hold_id, None)
+
+    async def _close(self, hold_id, payouts):
+        hold = self.holding(hold_id)
+        if not hold:
+            return
+        async with self.locked(*hold, *(payouts or ())):
+            hold = self.holding(hold_id)
+            if not hold:
+                return  # 잠금을 기다리는 사이 다른 쪽에서 정산함
+            self.store.delete("escrow_holds", hold_id)
+            self.credit_many_nowait(hold if payouts is None else payouts)
+        await self.store.sync()
+
+    @contextlib.asynccontextmanager
+    async def settling(self, hold_id: str):
+        """블록이 정산 없이 끝나면(return, 예외, 태스크 취소) 에스크로를 환불합니다. 정산이 끝났다면 아무 일도 없습니다."""
+        try:
+            yield
+        finally:
+            await asyncio.shield(self.refund(hold_id))
+
+    async def refund_orphans(self) -> int:
+        """시작 시 남아 있는 에스크로(정산 전에 봇이 꺼진 게임)를 모두 환불하고 건수를 돌려줍니다."""
+        orphans = list(self.store.get("escrow_holds", default={}))
+        for hold_id in orphans:
+            await self.refund(hold_id)
+        return len(orphans)
+
+    def held_total(self) -> tuple[int, int]:
+        holds = self.store.get("escrow_holds", default={})
+        return len(holds), sum(sum(stakes.values()) for stakes in holds.values())
+
+ledger = Ledger(store)
+
+# ───── 랭킹 인덱스 ─────
+class Leaderboard:
+    """user_points 순위 인덱스.
+
+    (-포인트, uid) 순으로 정렬된 리스트를 잔액이 바뀔 때마다 갱신해 두므로,
+    특정 유저의 순위는 bisect로 O(log n), 상위 k명/페이지 조회는 O(k)입니다.
+    """
+
+    def __init__(self):
+        self._keys: list[tuple[int, str]] = []
+        self._scores: dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def rebuild(self, points: dict | None):
+        self._scores = dict(points or {})
+        self._keys = sorted((-score, uid) for uid, score in self._scores.items())
+
+    def on_change(self, uid, score):
+        if uid is None:
+            return self.rebuild(score)
+        old = self._scores.pop(uid, None)
+        if old is not None:
+            i = bisect.bisect_left(self._keys, (-old, uid))
+            del self._keys[i]
+        if score is not None:
+            self._scores[uid] = score
+            bisect.insort(self._keys, (-score, uid))
+
+    def rank(self, uid) -> int | None:
+        score = self._scores.get(uid)
+        if score is None:
+            return None
+        return bisect.bisect_left(self._keys, (-score, uid)) + 1
+
+    def top(self, k=10, offset=0) -> list[tuple[str, int]]:
+        return [(uid, -neg) for neg, uid in self._keys[offset:offset + k]]
+
+    def page_count(self, size=10) -> int:
+        return max(1, -(-len(self._keys) // size))
+
+leaderboard = Leaderboard()
+store.watch("user_points", leaderboard.on_change)
+
+# ───── 임베드 렌더 캐시 ─────
+class RenderCache:
+    """자주 쓰는 응답 Embed 캐시.
+
+    고정 도움말은 시작할 때(setup_hook) 한 번 만들어 두고, 유저별 Embed는
+    (종류, uid, 데이터 버전, 표시에 쓰인 값들) 키로 LRU 보관합니다. 키가 같으면 서식을 다시 만들지 않습니다.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._builders: dict[str, callable] = {}
+        self._static: dict[str, Embed] = {}
+        self._user: dict[tuple, Embed] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def register_static(self, name, builder):
+        self._builders[name] = builder
+        self._static.pop(name, None)
+
+    def prebuild(self):
+        for name, builder in self._builders.items():
+            self._static[name] = builder()
+
+    def static(self, name) -> Embed:
+        embed = self._static.get(name)
+        if embed is None:
+            self.misses += 1
+            embed = self._static[name] = self._builders[name]()
+        else:
+            self.hits += 1
+        return embed
+
+    def user(self, key: tuple, builder) -> Embed:
+        embed = self._user.pop(key, None)
+        if embed is None:
+            self.misses += 1
+            embed = builder()
+            if len(self._user) >= self.max_entries:
+                self._user.pop(next(iter(self._user)))   # 가장 오래 안 쓴 항목
+        else:
+            self.hits += 1
+        self._user[key] = embed    # 맨 뒤로 (최근 사용)
+        return embed
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total * 100 if total else 0.0,
+            "entries": len(self._user) + len(self._static),
+        }
+
+renderer = RenderCache()
+
+# ───── 재능상점 카탈로그 ─────
+class TalentListing(NamedTuple):
+    seller_id: str
+    name: str
+    price: int
+    at: float      # 등록 시각 (예전 상품은 0)
+    seq: int       # 같은 시각일 때 등록 순서
+
+class TalentCatalog:
+    """(판매자, 상품명) → 상품 인덱스.
+
+    저장은 기존처럼 store["talent_store"][판매자]["items"] 단위로 하고(판매자 한 명분만 기록),
+    인덱스는 store.watch로 변경을 받아 갱신합니다. 구매/삭제는 dict 조회로 O(1),
+    전체 목록은 가격순·최신순으로 정렬된 리스트를 bisect로 유지합니다.
+    """
+
+    def __init__(self, store: DataStore):
+        self.store = store
+        self.version = 0
+        self._items: dict[tuple[str, str], TalentListing] = {}
+        self._by_seller: dict[str, dict[str, TalentListing]] = {}
+        self._by_price: list[tuple[int, float, int, str, str]] = []
+        self._by_recent: list[tuple[float, int, str, str]] = []
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    # ── 인덱스 갱신 ──
+    def rebuild(self, shop: dict | None):
+        self._items.clear()
+        self._by_seller.clear()
+        self._by_price.clear()
+        self._by_recent.clear()
+        for seller_id, info in (shop or {}).items():
+            for listing in self._index_seller(seller_id, info):
+                self._by_price.append(self._price_key(listing))
+                self._by_recent.append(self._recent_key(listing))
+        self._by_price.sort()
+        self._by_recent.sort()
+        self.version += 1
+
+    def on_change(self, seller_id, info):
+        if seller_id is None:
+            return self.rebuild(info)
+        prev = self._by_seller.pop(seller_id, {})
+        for listing in prev.values():
+            del self._items[(seller_id, listing.name)]
+            del self._by_price[bisect.bisect_left(self._by_price, self._price_key(listing))]
+            del self._by_recent[bisect.bisect_left(self._by_recent, self._recent_key(listing))]
+        if info:
+            for listing in self._index_seller(seller_id, info, prev):
+                bisect.insort(self._by_price, self._price_key(listing))
+                bisect.insort(self._by_recent, self._recent_key(listing))
+        self.version += 1
+
+    def _index_seller(self, seller_id, info, prev=None):
+        added = []
+        for item in info.get("items", []):
+            if prev and item["name"] in prev:
+                seq = prev[item["name"]].seq    # 가격만 바뀐 상품은 등록 순서 유지
+            else:
+                self._seq += 1
+                seq = self._seq
+            listing = TalentListing(seller_id, item["name"], item["price"], item.get("at", 0), seq)
+            old = self._items.get((seller_id, listing.name))
+            if old is not None:
+                # 예전 데이터의 같은 이름 중복은 마지막 항목만 남김
+                added.remove(old)
+            self._items[(seller_id, listing.name)] = listing
+            self._by_seller.setdefault(seller_id, {})[listing.name] = listing
+            added.append(listing)
+        return added
+
+    @staticmethod
+    def _price_key(listing):
+        return (listing.price, -listing.at, -listing.seq, listing.seller_id, listing.name)
+
+    @staticmethod
+    def _recent_key(listing):
+        return (-listing.at, -listing.seq, listing.seller_id, listing.name)
+
+    # ── 조회 ──
+    def get(self, seller_id, name) -> TalentListing | None:
+        return self._items.get((seller_id, name))
+
+    def seller_items(self, seller_id) -> list[TalentListing]:
+        return list(self._by_seller.get(seller_id, {}).values())
+
+    def listings(self, order="price", seller_id=None, min_price=None, max_price=None) -> list[TalentListing]:
+        """전체 목록 (판매자/가격 범위 필터). 가격 범위는 가격 인덱스를 bisect로 잘라 씁니다."""
+        if order == "price":
+            lo = 0 if min_price is None else bisect.bisect_left(self._by_price, (min_price,))
+            hi = len(self._by_price) if max_price is None else bisect.bisect_left(self._by_price, (max_price + 1,))
+            keys = self._by_price[lo:hi]
+        else:
+            keys = self._by_recent
+        rows = [self._items[(key[-2], key[-1])] for key in keys]
+        if seller_id is not None:
+            rows = [it for it in rows if it.seller_id == seller_id]
+        if order != "price" and (min_price is not None or max_price is not None):
+            rows = [it for it in rows
+                    if (min_price is None or it.price >= min_price) and (max_price is None or it.price <= max_price)]
+        return rows
+
+    # ── 변경 (판매자 한 명분만 기록) ──
+    def _save(self, seller_id, listings):
+        items = [{"name": it.name, "price": it.price, "at": it.at} for it in listings]
+        if items:
+            self.store.set("talent_store", seller_id, {"items": items})
+        else:
+            self.store.delete("talent_store", seller_id)
+
+    def register(self, seller_id, name, price) -> bool:
+        """등록 – 같은 이름이 이미 있으면 가격을 갱신하고 False"""
+        listings = self._by_seller.get(seller_id, {})
+        existed = name in listings
+        updated = [it._replace(price=price) if it.name == name else it for it in listings.values()]
+        if not existed:
+            updated.append(TalentListing(seller_id, name, price, round(time.time(), 3), 0))
+        self._save(seller_id, updated)
+        return not existed
+
+    def remove(self, seller_id, name) -> bool:
+        listings = self._by_seller.get(seller_id, {})
+        if name not in listings:
+            return False
+        self._save(seller_id, [it for it in listings.values() if it.name != name])
+        return True
+
+catalog = TalentCatalog(store)
+store.watch("talent_store", catalog.on_change)
+
+# ───── 재능상점 검색 인덱스 ─────
+CHOSUNG_SET = frozenset(CHOSUNG_LIST)
+
+class TalentSearchIndex:
+    """상품명 역색인 (1·2-gram + 초성 1·2-gram).
+
+    검색어의 n-gram별 후보 집합을 작은 것부터 교집합해 후보를 좁힌 뒤 부분 문자열로 확인하므로,
+    전체 상품을 훑지 않습니다. 검색어가 초성(ㄱ~ㅎ)으로만 이뤄지면 초성 색인을 씁니다.
+    카탈로그가 갱신된 뒤 같은 store.watch 알림으로 판매자 단위 증분 갱신합니다.
+    """
+
+    def __init__(self, catalog: TalentCatalog):
+        self.catalog = catalog
+        self._text: dict[tuple[str, str], tuple[str, str]] = {}     # 키 → (정규화 이름, 초성)
+        self._grams: dict[str, set] = {}
+        self._chosung_grams: dict[str, set] = {}
+        self._names: dict[str, set[str]] = {}                        # 판매자 → 색인된 상품명
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return "".join(text.lower().split())
+
+    @staticmethod
+    def _ngrams(text: str) -> set[str]:
+        return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+    def _add(self, key):
+        text = self.normalize(key[1])
+        chosung = get_chosung(text)
+        self._text[key] = (text, chosung)
+        for gram in self._ngrams(text):
+            self._grams.setdefault(gram, set()).add(key)
+        for gram in self._ngrams(chosung):
+            self._chosung_grams.setdefault(gram, set()).add(key)
+
+    def _remove(self, key):
+        text, chosung = self._text.pop(key)
+        for postings, grams in ((self._grams, self._ngrams(text)), (self._chosung_grams, self._ngrams(chosung))):
+            for gram in grams:
+                bucket = postings[gram]
+                bucket.discard(key)
+                if not bucket:
+                    del postings[gram]
+
+    def rebuild(self, _shop=None):
+        self._text.clear()
+        self._grams.clear()
+        self._chosung_grams.clear()
+        self._names.clear()
+        for listing in self.catalog.listings():
+            self._names.setdefault(listing.seller_id, set()).add(listing.name)
+            self._add((listing.seller_id, listing.name))
+
+    def on_change(self, seller_id, info):
+        if seller_id is None:
+            return self.rebuild()
+        old = self._names.pop(seller_id, set())
+        new = {it.name for it in self.catalog.seller_items(seller_id)}
+        for name in old - new:
+            self._remove((seller_id, name))
+        for name in new - old:
+            self._add((seller_id, name))
+        if new:
+            self._names[seller_id] = new
+
+    def search(self, query: str) -> list[TalentListing]:
+        """부분 문자열 / 초성 검색 – 가격순"""
+        q = self.normalize(query)
+        if not q:
+            return []
+        by_chosung = all(ch in CHOSUNG_SET for ch in q)
+        postings = self._chosung_grams if by_chosung else self._grams
+        grams = {q[i:i + 2] for i in range(len(q) - 1)} or {q}
+        buckets = sorted((postings.get(gram, ()) for gram in grams), key=len)
+        if not buckets[0]:
+            return []
+        candidates = set(buckets[0]).intersection(*buckets[1:])
+        field = 1 if by_chosung else 0
+        hits = [self.catalog.get(*key) for key in candidates if q in self._text[key][field]]
+        return sorted(hits, key=lambda it: (it.price, it.seller_id, it.name))
+
+talent_search = TalentSearchIndex(catalog)
+store.watch("talent_store", talent_search.on_change)   # catalog 다음에 등록 (갱신된 카탈로그를 읽음)
+
+# ───── 재능상점 구경 페이지 ─────
+TALENT_PAGE_SIZE = 10
+TALENT_NAME_MAX = 80          # 한 줄에 표시할 상품명 최대 길이
+TALENT_BROWSE_TIMEOUT = 180   # 버튼 유효 시간(초)
+
+def seller_members(guild, seller_ids) -> dict:
+    """판매자마다 한 번만 멤버를 찾아 {seller_id: Member 또는 None}으로 돌려줍니다 (상품이 많은 판매자도 조회는 1회)"""
+    return {sid: guild.get_member(int(sid)) for sid in seller_ids}
+
+class TalentBrowser:
+    """구경 결과/페이지 렌더 캐시.
+
+    (서버, 판매자, 최소, 최대) 조건별 목록과 페이지 Embed를 catalog.version 기준으로 보관하고,
+    버전이 바뀌면(등록/삭제/가격 변경) 통째로 비웁니다. 페이지는 요청될 때만 만듭니다.
+    """
+
+    def __init__(self, catalog: TalentCatalog, max_entries=128):
+        self.catalog = catalog
+        self.max_entries = max_entries
+        self._version = None
+        self._rows: dict[tuple, list[TalentListing]] = {}
+        self._pages: dict[tuple, Embed] = {}
+
+    def _check_version(self):
+        if self._version != self.catalog.version:
+            self._rows.clear()
+            self._pages.clear()
+            self._version = self.catalog.version
+
+    @staticmethod
+    def _remember(cache, key, value, limit):
+        if len(cache) >= limit:
+            cache.pop(next(iter(cache)))   # 가장 오래된 항목부터
+        cache[key] = value
+
+    def rows(self, guild, query) -> list[TalentListing]:
+        self._check_version()
+        key = (guild.id, *query)
+        rows = self._rows.get(key)
+        if rows is None:
+            seller_id, min_price, max_price = query
+            listings = self.catalog.listings("price", seller_id, min_price, max_price)
+            members = seller_members(guild, {it.seller_id for it in listings})
+            rows = [it for it in listings if members[it.seller_id]]
+            self._remember(self._rows, key, rows, self.max_entries)
+        return rows
+
+    def page_count(self, guild, query) -> int:
+        return max(1, -(-len(self.rows(guild, query)) // TALENT_PAGE_SIZE))
+
+    def page(self, guild, query, page) -> Embed:
+        rows = self.rows(guild, query)
+        key = (guild.id, *query, page)
+        embed = self._pages.get(key)
+        if embed is None:
+            embed = self._render(guild, query, rows, page)
+            self._remember(self._pages, key, embed, self.max_entries * 4)
+        return embed
+
+    @staticmethod
+    def _render(guild, query, rows, page) -> Embed:
+        seller_id, min_price, max_price = query
+        offset = (page - 1) * TALENT_PAGE_SIZE
+        shown = rows[offset:offset + TALENT_PAGE_SIZE]
+        members = seller_members(guild, {it.seller_id for it in shown})
+        lines = []
+        for i, item in enumerate(shown, start=offset + 1):
+            member = members[item.seller_id]
+            name = item.name if len(item.name) <= TALENT_NAME_MAX else item.name[:TALENT_NAME_MAX - 1] + "…"
+            lines.append(f"**{i}. {name}**\n• 👤 {member.display_name if member else '알 수 없음'} • 💰 {item.price}코인")
+
+        filters = []
+        if seller_id:
+            member = guild.get_member(int(seller_id))
+            filters.append(f"👤 {member.display_name if member else seller_id}")
+        if min_price is not None or max_price is not None:
+            filters.append(f"💰 {min_price or 0}~{'' if max_price is None else max_price}코인")
+
+        embed = discord.Embed(title="🛍️ 전체 재능상점 목록", description="\n".join(lines), color=discord.Color.green())
+        pages = max(1, -(-len(rows) // TALENT_PAGE_SIZE))
+        footer = f"{page}/{pages} 페이지 • 상품 {len(rows)}개"
+        if filters:
+            footer += " • " + " ".join(filters)
+        embed.set_footer(text=footer)
+        return embed
+
+talent_browser = TalentBrowser(catalog)
+
+class TalentBrowseView(discord.ui.View):
+    """◀ ▶ 버튼으로 페이지를 넘기는 구경 화면 (명령을 입력한 사람만 조작)"""
+
+    def __init__(self, author_id, guild, query):
+        super().__init__(timeout=TALENT_BROWSE_TIMEOUT)
+        self.author_id = author_id
+        self.guild = guild
+        self.query = query
+        self.page = 1
+        self.message = None
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        pages = talent_browser.page_count(self.guild, self.query)
+        self.page = min(max(self.page, 1), pages)
+        self.prev_page.disabled = self.page <= 1
+        self.next_page.disabled = self.page >= pages
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ 직접 `!재능상점 구경`을 입력해 주세요.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction):
+        self._sync_buttons()
+        embed = talent_browser.page(self.guild, self.query, self.page)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page -= 1
+        await self._show(interaction)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await self._show(interaction)
+
+    async def on_timeout(self):
+        for child in self.children:
+            child.disabled = True
+        if self.message:
+            with contextlib.suppress(discord.HTTPException):
+                await self.message.edit(view=self)
+
+def parse_price_range(text):
+    """'10-50', '10-', '-50', '10~50' → (최소, 최대). 형식이 틀리면 None"""
+    m = re.fullmatch(r"\s*(\d*)\s*[-~]\s*(\d*)\s*", text or "")
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    low = int(m.group(1)) if m.group(1) else None
+    high = int(m.group(2)) if m.group(2) else None
+    return low, high
 
 # ───── 파서 완전 안정화 ─────
 def extract_name_and_price(args):
@@ -116,8 +1317,6 @@ def extract_name_and_price(args):
 
 # ───── 버튼 설정 ─────
 TOKEN = os.environ.get("BOT_TOKEN")
-if not TOKEN:
-    raise ValueError("❗ BOT_TOKEN 환경변수가 설정되지 않았습니다.")
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -125,43 +1324,154 @@ intents.members = True
 intents.voice_states = True
 bot = commands.Bot(command_prefix="!", intents=intents)
 
+@bot.event
+async def setup_hook():
+    # Heroku 등은 재시작 시 SIGTERM을 보냄 → 정상 종료 경로로 보내 남은 데이터를 저장
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(bot.close()))
+    except NotImplementedError:
+        pass  # Windows
+    command_trie.build(bot)
+    renderer.prebuild()   # 로그인 후라 bot.user(썸네일)를 쓸 수 있음
+    voice_tracker.start()
+    races.start()
+    refunded = await ledger.refund_orphans()
+    if refunded:
+        print(f"💸 정산되지 않은 게임 {refunded}건의 판돈을 환불했습니다.")
+
 # ───── 음성 접속 포인트 적립 설정 ─────
 POINT_RATE = {"on": 2, "off": 1}          # 1분당 적립 포인트
-user_join_times: dict[str, datetime.datetime] = {}
-user_mic_history: dict[str, list[tuple[datetime.datetime, bool]]] = {}
-
-def save_username(member: discord.Member):
-    """닉네임 변경 시 기록 (선택: 이미 처리 중이면 제거)"""
-    data = read_data()
-    uid = str(member.id)
-    data.setdefault("usernames", {})[uid] = member.display_name
-    write_data(data)
-
-def process_voice_leave(uid: str, leave_time: datetime.datetime):
-    """채널을 완전히 떠나거나 이동할 때 호출 – 머무른 시간만큼 포인트 계산"""
-    join_time = user_join_times.pop(uid, None)
-    history   = user_mic_history.pop(uid, [])
-
-    if not join_time:
-        return  # 비정상 종료 보호
-
-    history.append((leave_time, history[-1][1] if history else False))
-
-    # join_time 이후 구간만 남김
-    history = [(t, m) for t, m in history if t >= join_time]
-
-    total_minutes = 0.0
-    for (t1, mic_on1), (t2, _) in zip(history, history[1:]):
-        mins = (t2 - t1).total_seconds() / 60
-        total_minutes += mins * (POINT_RATE["on"] if mic_on1 else POINT_RATE["off"])
-
-    earned = int(total_minutes)  # 소수점 버림
+VOICE_CREDIT_INTERVAL = 60.0              # 세션 체크포인트 + 적립 포인트 일괄 지급 주기(초)
+VOICE_EXCLUDED_IDS = {'1241383865478807582', '1289824359002669126'}   # TTS 봇
+
+class VoiceSession:
+    """접속 중인 사용자 한 명의 누적 상태 – 토글 기록 대신 마지막 시점/마이크 상태/가중 분만 유지"""
+    __slots__ = ("last", "mic_on", "accrued")
+
+    def __init__(self, now: datetime.datetime, mic_on: bool, accrued: float = 0.0):
+        self.last = now
+        self.mic_on = mic_on
+        self.accrued = accrued
+
+    def advance(self, now: datetime.datetime) -> float:
+        """마지막 시점부터 now까지를 현재 마이크 상태의 배율로 누적"""
+        if now > self.last:
+            mins = (now - self.last).total_seconds() / 60
+            self.accrued += mins * (POINT_RATE["on"] if self.mic_on else POINT_RATE["off"])
+            self.last = now
+        return self.accrued
+
+class VoiceTracker:
+    """음성 세션을 메모리에서 관리하는 적립 엔진.
+
+    닉네임은 바뀌었을 때만 기록합니다. 퇴장 시 계산된 포인트는 voice_pending에 쌓았다가
+    VOICE_CREDIT_INTERVAL마다 원장에 한 번의 일괄 지급으로 반영합니다.
+    진행 중인 세션은 같은 주기로 지금까지의 가중 분(accrued)만 voice_sessions에 체크포인트해 두고,
+    재시작 시 reconcile()이 게이트웨이의 현재 음성 상태와 맞춰 이어 가거나 마감합니다.
+    """
+
+    def __init__(self, ledger: Ledger):
+        self.ledger = ledger
+        self.store = ledger.store
+        self.sessions: dict[str, VoiceSession] = {}
+        self._task: asyncio.Task | None = None
+
+    def save_username(self, member: discord.Member):
+        uid = str(member.id)
+        if self.store.get("usernames", uid, None) != member.display_name:
+            self.store.set("usernames", uid, member.display_name)
+
+    def join(self, uid: str, now: datetime.datetime, mic_on: bool, accrued: float = 0.0):
+        self.sessions[uid] = VoiceSession(now, mic_on, accrued)
+
+    def toggle(self, uid: str, now: datetime.datetime, mic_on: bool):
+        session = self.sessions.get(uid)
+        if session is None:
+            return
+        session.advance(now)
+        session.mic_on = mic_on
+
+    def leave(self, uid: str, leave_time: datetime.datetime):
+        """채널을 완전히 떠나거나 이동할 때 호출 – 머무른 시간만큼 포인트 계산"""
+        session = self.sessions.pop(uid, None)
+        if session is None:
+            return  # 비정상 종료 보호
+        self._close(uid, session.advance(leave_time))
+
+    def _close(self, uid: str, total_minutes: float):
+        earned = int(total_minutes)  # 소수점 버림
+        if earned > 0:
+            self.store.add("voice_pending", uid, earned)
+        if uid in self.store.data["voice_sessions"]:
+            self.store.delete("voice_sessions", uid)
+
+    def checkpoint(self, now: datetime.datetime):
+        """진행 중인 세션마다 누적 가중 분만 기록 (토글 기록 전체는 저장하지 않음)"""
+        for uid, session in self.sessions.items():
+            self.store.set("voice_sessions", uid, {
+                "accrued": round(session.advance(now), 4),
+                "at": now.isoformat(),
+                "mic": session.mic_on,
+            })
+
+    def reconcile(self, guilds, now: datetime.datetime):
+        """게이트웨이 캐시의 현재 음성 상태와 세션을 맞춥니다 (재시작/재접속 직후)"""
+        in_voice = {}
+        for guild in guilds:
+            for channel in guild.voice_channels + guild.stage_channels:
+                for member in channel.members:
+                    uid = str(member.id)
+                    if not member.bot and uid not in VOICE_EXCLUDED_IDS:
+                        in_voice[uid] = member
+
+        # 체크포인트만 남은 세션: 아직 음성에 있으면 이어 가고, 나갔으면 체크포인트까지로 마감
+        for uid, rec in list(self.store.data["voice_sessions"].items()):
+            if uid in self.sessions:
+                continue
+            if uid in in_voice:
+                self.join(uid, now, not in_voice[uid].voice.self_mute, accrued=rec["accrued"])
+            else:
+                self._close(uid, rec["accrued"])
+
+        # 연결이 끊긴 동안 놓친 입장/퇴장
+        for uid in list(self.sessions):
+            if uid not in in_voice:
+                self.leave(uid, now)
+        for uid, member in in_voice.items():
+            if uid not in self.sessions:
+                self.join(uid, now, not member.voice.self_mute)
+
+    async def flush(self):
+        batch = dict(self.store.data["voice_pending"])
+        if not batch:
+            return
+        async with self.ledger.locked(*batch):
+            self._credit(batch)
+        await self.store.sync()
+
+    def _credit(self, batch):
+        self.ledger.credit_many_nowait(batch, stats_keys=("activity_xp",))
+        for uid, earned in batch.items():
+            self.store.add("voice_pending", uid, -earned)
+            if not self.store.data["voice_pending"][uid]:
+                self.store.delete("voice_pending", uid)
+
+    def drain(self):
+        """이벤트 루프가 멈춘 뒤(종료 시) 세션을 체크포인트하고 남은 적립분을 바로 반영"""
+        self.checkpoint(datetime.datetime.utcnow())
+        self._credit(dict(self.store.data["voice_pending"]))
+
+    def start(self):
+        if not self._task or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._credit_loop())
+
+    async def _credit_loop(self):
+        while True:
+            await asyncio.sleep(VOICE_CREDIT_INTERVAL)
+            self.checkpoint(datetime.datetime.utcnow())
+            await self.flush()
 
-    if earned > 0:
-        data = read_data()
-        data["user_points"][uid]  = data["user_points"].get(uid, 0)  + earned
-        data["activity_xp"][uid]  = data["activity_xp"].get(uid, 0)  + earned
-        write_data(data)
+voice_tracker = VoiceTracker(ledger)
 
 # ───── 음성 상태 이벤트 ─────
 @bot.event
@@ -169,59 +1479,245 @@ async def on_voice_state_update(member: discord.Member, before: discord.VoiceSta
     uid = str(member.id)
 
     # ✅ TTS 봇 제외
-    if uid in ['1241383865478807582', '1289824359002669126']:
+    if uid in VOICE_EXCLUDED_IDS:
         return
 
     now = datetime.datetime.utcnow()
-    save_username(member)
+    voice_tracker.save_username(member)
 
     prev_channel = before.channel
     curr_channel = after.channel
 
     # 1) 채널 입장
     if not prev_channel and curr_channel:
-        user_join_times[uid]   = now
-        user_mic_history[uid]  = [(now, not after.self_mute)]
+        voice_tracker.join(uid, now, not after.self_mute)
 
     # 2) 같은 채널 내에서 mute/unmute 토글
     elif prev_channel and curr_channel and prev_channel.id == curr_channel.id:
-        user_mic_history.setdefault(uid, []).append((now, not after.self_mute))
+        voice_tracker.toggle(uid, now, not after.self_mute)
 
     # 3) 채널 이동
     elif prev_channel and curr_channel and prev_channel.id != curr_channel.id:
-        process_voice_leave(uid, now)
-        user_join_times[uid]   = now
-        user_mic_history[uid]  = [(now, not after.self_mute)]
+        voice_tracker.leave(uid, now)
+        voice_tracker.join(uid, now, not after.self_mute)
 
     # 4) 채널 퇴장
     elif prev_channel and not curr_channel:
-        process_voice_leave(uid, now)
+        voice_tracker.leave(uid, now)
+
+@bot.event
+async def on_ready():
+    # 재시작/재접속 시 음성 세션을 현재 상태와 맞춤 (on_ready는 재접속마다 다시 호출될 수 있음)
+    voice_tracker.reconcile(bot.guilds, datetime.datetime.utcnow())
+
+# ───── 게임 입력 라우터 ─────
+class Subscription:
+    """라우터에 등록된 대기 하나. 맞는 메시지가 queue에 쌓이고, with 블록을 나가거나 close()하면 해제됩니다."""
+
+    def __init__(self, router: "InteractionRouter", keys: list[tuple]):
+        self.router = router
+        self.keys = keys
+        self.queue: asyncio.Queue[discord.Message] = asyncio.Queue()
+
+    async def get(self, timeout: float) -> discord.Message:
+        """다음 메시지 (timeout이 지나면 asyncio.TimeoutError)"""
+        return await asyncio.wait_for(self.queue.get(), max(timeout, 0))
+
+    def close(self):
+        self.router._remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class InteractionRouter:
+    """게임 입력 대기를 (채널, 작성자, 토큰) 키로 모아 두고 메시지마다 O(1) 조회로 전달합니다.
+
+    작성자나 토큰 자리에 None을 넣으면 아무나/아무 내용이나 받습니다. 토큰은 앞뒤 공백을 뺀 내용 전체와
+    비교하고, prefix=True면 첫 단어와 비교합니다 (`!배팅금 50` 등). 대기가 없는 채널의 메시지는 dict 조회 한 번으로 끝납니다.
+    """
+
+    def __init__(self):
+        self._exact: dict[tuple, list[Subscription]] = {}
+        self._first: dict[tuple, list[Subscription]] = {}
+        self._channels: dict[int, int] = {}   # 채널별 등록된 키 수
+
+    def subscribe(self, channel_id: int, authors=None, tokens=None, *, prefix=False) -> Subscription:
+        table = "first" if prefix else "exact"
+        keys = [(table, (channel_id, author, token))
+                for author in (authors if authors is not None else (None,))
+                for token in (tokens if tokens is not None else (None,))]
+        sub = Subscription(self, keys)
+        for table, key in keys:
+            (self._first if table == "first" else self._exact).setdefault(key, []).append(sub)
+        self._channels[channel_id] = self._channels.get(channel_id, 0) + len(keys)
+        return sub
+
+    def _remove(self, sub: Subscription):
+        for table, key in sub.keys:
+            bucket = (self._first if table == "first" else self._exact).get(key)
+            if bucket and sub in bucket:
+                bucket.remove(sub)
+                if not bucket:
+                    del (self._first if table == "first" else self._exact)[key]
+                self._channels[key[0]] -= 1
+                if not self._channels[key[0]]:
+                    del self._channels[key[0]]
+        sub.keys = []
+
+    def dispatch(self, message: discord.Message):
+        channel_id = message.channel.id
+        if channel_id not in self._channels:
+            return
+        content = message.content.strip()
+        author = message.author.id
+        delivered = set()
+        lookups = [(self._exact, (channel_id, a, t)) for a in (author, None) for t in (content, None)]
+        if self._first:
+            first = content.split(None, 1)[0] if content else ""
+            lookups += [(self._first, (channel_id, a, first)) for a in (author, None)]
+        for table, key in lookups:
+            for sub in table.get(key, ()):
+                if id(sub) not in delivered:
+                    delivered.add(id(sub))
+                    sub.queue.put_nowait(message)
+
+    def active(self) -> int:
+        return sum(self._channels.values())
+
+interactions = InteractionRouter()
 
 # ───── 초성 명령어 처리 이벤트 ─────
+class _TrieNode:
+    __slots__ = ("children", "target", "reachable")
+
+    def __init__(self):
+        self.children: dict[str, "_TrieNode"] = {}
+        self.target: str | None = None      # 이 노드에서 끝나는 키가 가리키는 명령어
+        self.reachable: set[str] = set()     # 이 접두사로 갈 수 있는 명령어들
+
+class CommandTrie:
+    """명령어 이름·별칭·초성 별칭 → 명령어 이름.
+
+    시작할 때 등록된 모든 명령어에서 get_chosung으로 초성 별칭을 만들고 초성명령어의 수동 지정을 덮어씁니다.
+    조회는 정확히 일치하는 키를 우선하고, 없으면 접두사가 한 명령어로만 이어질 때 그 명령어로 보냅니다.
+    관리자/파괴적 명령어(exact_only)는 초성 자동 별칭과 접두사 조회에서 빠지고, 이름·별칭(초성명령어의 수동 지정 포함)이
+    정확히 맞을 때만 실행됩니다.
+    """
+    exact_only = frozenset({"초기화", "지급", "저장상태"})   # `!초` 한 글자로 데이터가 지워지지 않도록
+
+    def __init__(self):
+        self.root = _TrieNode()
+        self.size = 0
+
+    def build(self, bot: commands.Bot):
+        keys: dict[str, str] = {}
+        ambiguous: set[str] = set()
+        for command in bot.commands:
+            if command.name in self.exact_only:
+                continue                     # 관리자/파괴적 명령어는 초성 자동 별칭도 만들지 않음 (`!ㅊㄱㅎ` 오타 방지)
+            for name in (command.name, *command.aliases):
+                alias = get_chosung(name)
+                if alias == name:
+                    continue
+                if keys.get(alias, command.name) != command.name:
+                    ambiguous.add(alias)     # 초성이 겹치는 명령어는 자동 별칭을 만들지 않음
+                keys[alias] = command.name
+        for alias in ambiguous:
+            del keys[alias]
+        for alias, name in 초성명령어.items():
+            if name in bot.all_commands:
+                keys[alias] = bot.all_commands[name].name
+        for name, command in bot.all_commands.items():
+            keys[name] = command.name        # 실제 이름/별칭이 항상 우선
+
+        self.root = _TrieNode()
+        for key, target in keys.items():
+            self.insert(key, target)
+        self.size = len(keys)
+
+    def insert(self, key: str, target: str):
+        prefixable = target not in self.exact_only
+        node = self.root
+        for ch in key:
+            if prefixable:
+                node.reachable.add(target)
+            node = node.children.setdefault(ch, _TrieNode())
+        if prefixable:
+            node.reachable.add(target)
+        node.target = target
+
+    def resolve(self, token: str) -> str | None:
+        node = self.root
+        for ch in token:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        if node.target is not None:
+            return node.target
+        if len(node.reachable) == 1:
+            return next(iter(node.reachable))
+        return None  # 여러 명령어의 공통 접두사
+
+command_trie = CommandTrie()
+
 @bot.event
 async def on_message(message: discord.Message):
     if message.author.bot:
         return
 
-    if message.content.startswith("!"):
-        cmd_only = message.content.split()[0][1:]
-        full_cmd = 초성명령어.get(cmd_only)
-        if full_cmd:
-            message.content = message.content.replace(f"!{cmd_only}", f"!{full_cmd}", 1)
+    interactions.dispatch(message)   # 진행 중인 게임 입력 대기 (명령어 처리는 그대로 이어서 진행)
 
-    await bot.process_commands(message)
+    if not message.content.startswith("!"):
+        return   # 일반 대화: 접두사가 없으면 명령어일 수 없으므로 컨텍스트도 만들지 않음
+
+    # 메시지를 자르거나 고쳐 쓰지 않고, 파싱된 첫 단어만 트라이로 풀어서 명령어를 지정
+    ctx = await bot.get_context(message)
+    if ctx.command is None and ctx.invoked_with:
+        name = command_trie.resolve(ctx.invoked_with)
+        if name:
+            ctx.command = bot.all_commands[name]
+    await bot.invoke(ctx)
 
 # ───── 레벨 시스템 ─────
 def xp_for_next(level):
     return 100 + level * 20
 
+def xp_to_reach(level):
+    """1레벨부터 level까지 필요한 누적 XP: Σ(100 + 20i), i=1..level-1 = 10(level-1)(level+10)"""
+    return 10 * (level - 1) * (level + 10)
+
+class LevelInfo(NamedTuple):
+    level: int
+    current: int      # 현재 레벨에서 쌓은 XP
+    needed: int       # 현재 레벨 → 다음 레벨 구간 XP
+    remaining: int    # 다음 레벨까지 남은 XP
+    tier: str
+
+def level_info(total_xp) -> LevelInfo:
+    """누적 XP로 레벨/구간 XP/남은 XP/티어를 O(1)에 계산 (등차수열 합의 역함수)"""
+    # 10(L-1)(L+10) <= xp  ⇔  L <= (sqrt(12100 + 40·xp) - 90) / 20
+    level = max(1, (math.isqrt(max(0, 12100 + 40 * total_xp)) - 90) // 20)
+    current = total_xp - xp_to_reach(level)
+    needed = xp_for_next(level)
+    return LevelInfo(level, current, needed, needed - current, get_rank(level))
+
+def level_info_many(xps) -> list[LevelInfo]:
+    """여러 유저의 XP를 한 번에 계산 (랭킹/통계용)"""
+    isqrt, tiers = math.isqrt, _TIER_BY_LEVEL
+    result = []
+    for xp in xps:
+        level = max(1, (isqrt(max(0, 12100 + 40 * xp)) - 90) // 20)
+        current = xp - 10 * (level - 1) * (level + 10)
+        needed = 100 + level * 20
+        result.append(LevelInfo(level, current, needed, needed - current, tiers[min(level, 100)]))
+    return result
+
 def calculate_level(total_xp):
-    level = 1
-    while total_xp >= xp_for_next(level):
-        total_xp -= xp_for_next(level)
-        level += 1
-    remaining = xp_for_next(level) - total_xp
-    return level, remaining
+    info = level_info(total_xp)
+    return info.level, info.remaining
 
 def get_rank(level):
     if level >= 100: return "Challenger"
@@ -236,59 +1732,70 @@ def get_rank(level):
     if level >= 19: return "Iron"
     return "Unrank"
 
+_TIER_BY_LEVEL = [get_rank(level) for level in range(101)]   # 100 이상은 모두 Challenger
+
+# ───── 게임 난수 ─────
+GAME_SEED = os.environ.get("GAME_SEED")   # 지정하면 게임별 결과 난수열을 그대로 재현 가능 (감사/테스트용)
+
+def make_game_rng(game: str, seed=GAME_SEED) -> random.Random:
+    """게임별 독립 난수 생성기. seed가 있으면 (seed, 게임 이름)으로 고정되어 다른 게임 호출에 영향받지 않음"""
+    return random.Random(f"{seed}:{game}") if seed is not None else random.Random()
+
+GAME_RNG = {game: make_game_rng(game) for game in ("출석", "구걸", "도박", "슬롯", "경마", "숫자게임", "가위바위보", "주사위")}
+
 # ───── 출석 ─────
+CHECKIN_REWARD = 50
+CHECKIN_BONUS = 77           # CHECKIN_BONUS_CHANCE 확률로 추가 지급
+CHECKIN_BONUS_CHANCE = 0.05
 MILESTONES = {5: 50, 10: 100, 15: 150, 20: 200, 30: 300, 50: 500, 75: 750, 100: 1000}
 GIVERS = ["Margo", "지봄이", "노듀오", "리망쿠", "인영킴이", "영규", "슝슝이", "재앙이"]
 
+def roll_checkin_bonus(rng: random.Random) -> int:
+    return CHECKIN_BONUS if rng.random() < CHECKIN_BONUS_CHANCE else 0
+
 @bot.command()
 async def 출석(ctx):
-    data = read_data()
+    data = store.data
     uid = str(ctx.author.id)
     now = datetime.datetime.utcnow() + datetime.timedelta(hours=9)
     today = now.strftime("%Y-%m-%d")
     yesterday = (now - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
 
-    data["checkin_log"].setdefault(uid, [])
-    data["streak_log"].setdefault(uid, 0)
-    data["user_points"].setdefault(uid, 0)
-    data["activity_xp"].setdefault(uid, 0)
+    rec = data["checkin_log"].get(uid)
 
-    if today in data["checkin_log"][uid]:
+    if rec and rec["last"] == today:
         await ctx.send(f"❗ 이미 {today}에 출석하셨습니다.")
         return
 
-    if yesterday in data["checkin_log"][uid]:
-        data["streak_log"][uid] += 1
+    if rec and rec["last"] == yesterday:
+        store.add("streak_log", uid, 1)
     else:
-        data["streak_log"][uid] = 1
+        store.set("streak_log", uid, 1)
 
-    base_reward = 50
-    bonus = 77 if random.random() < 0.05 else 0  # 5% 확률로 77포인트, 아니면 0
+    base_reward = CHECKIN_REWARD
+    bonus = roll_checkin_bonus(GAME_RNG["출석"])
     total = base_reward + bonus
 
-    data["user_points"][uid] += total
-    data["activity_xp"][uid] += total
-    data["checkin_log"][uid].append(today)
+    rec = store.set("checkin_log", uid, mark_checkin(rec, today))
 
-    total_checkins = len(data["checkin_log"][uid])
+    total_checkins = rec["total"]
     milestone_bonus = MILESTONES.get(total_checkins, 0)
     milestone_msg = ""
 
+    total += milestone_bonus
+    await ledger.credit(uid, total, stats={"activity_xp": total})
+
     if milestone_bonus:
-        data["user_points"][uid] += milestone_bonus
-        data["activity_xp"][uid] += milestone_bonus
-        giver = random.choice(GIVERS)
+        giver = random.choice(GIVERS)       # 문구 선택은 결과와 무관하므로 전역 random 사용
         meme = random.choice([
             f"{giver}가 포인트를 던지고 사라졌습니다! 🏃‍♂️",
             f"{giver}가 '이 정도면 만족?' {milestone_bonus}포인트 던짐~ 😏"
         ])
         milestone_msg = f"🎯 누적 {total_checkins}일 출석 보상 획득! {meme}"
 
-    write_data(data)
-
     # 보너스 메시지 추가
     bonus_msg = ""
-    if bonus == 77:
+    if bonus:
         bonus_msg = (
             f"@{ctx.author.display_name}님의 출석이 메카살인기의 심장을 깨워\n"
             f"🎉 대박! 추가로 **{bonus}포인트**를 획득했습니다!"
@@ -315,64 +1822,73 @@ async def 출석(ctx):
 
 @bot.command()
 async def 출석현황(ctx):
-    data = read_data()
+    data = store.data
     uid = str(ctx.author.id)
-    total_days = len(data["checkin_log"].get(uid, []))
+    rec = data["checkin_log"].get(uid)
+    total_days = rec["total"] if rec else 0
     streak_days = data["streak_log"].get(uid, 0)
 
-    next_milestone = next((m for m in sorted(MILESTONES) if total_days < m), None)
-    remain_text = (
-        f"🔥 다음 출석 보상까지 {next_milestone - total_days}일 남았습니다."
-        if next_milestone else "🎉 최고 보상까지 모두 도달했습니다!"
-    )
+    name, avatar = ctx.author.display_name, ctx.author.display_avatar.url
 
-    embed = discord.Embed(
-        title=f"**📊 {ctx.author.display_name} 님의 출석 현황**",
-        description=(
-            f"• 🏃🏻 누적 출석 {total_days}일, 연속 {streak_days}일\n"
-            f"• {remain_text}"
-        ),
-        color=discord.Color.blue()
-    )
-    embed.set_thumbnail(url=ctx.author.display_avatar.url)
+    def build():
+        next_milestone = next((m for m in sorted(MILESTONES) if total_days < m), None)
+        remain_text = (
+            f"🔥 다음 출석 보상까지 {next_milestone - total_days}일 남았습니다."
+            if next_milestone else "🎉 최고 보상까지 모두 도달했습니다!"
+        )
+
+        embed = discord.Embed(
+            title=f"**📊 {name} 님의 출석 현황**",
+            description=(
+                f"• 🏃🏻 누적 출석 {total_days}일, 연속 {streak_days}일\n"
+                f"• {remain_text}"
+            ),
+            color=discord.Color.blue()
+        )
+        embed.set_thumbnail(url=avatar)
+        return embed
 
+    embed = renderer.user(("출석현황", uid, store.version(uid), name, avatar), build)
     await ctx.send(embed=embed)
 
 # ───── 포인트 조회 ─────
 @bot.command()
 async def 포인트(ctx):
-    data = read_data()
+    data = store.data
     uid = str(ctx.author.id)
 
-    total_activity = data['activity_xp'].get(uid, 0)
-    total_admin = data['admin_xp'].get(uid, 0)
-    total_gamble = data['gamble_points'].get(uid, 0)
-    total_xp = total_activity + total_admin
+    rank, ranked = leaderboard.rank(uid), len(leaderboard)   # 다른 유저 변동으로도 바뀌므로 키에 포함
+    name, avatar = ctx.author.display_name, ctx.author.display_avatar.url
 
-    lvl, remain = calculate_level(total_xp)
-    cur_xp = total_xp - sum(xp_for_next(i) for i in range(1, lvl))
-    prog = int(cur_xp / xp_for_next(lvl) * 10)
-    
-    bar = "🟩" * prog + "⬛" * (10 - prog)
+    def build():
+        total_activity = data['activity_xp'].get(uid, 0)
+        total_admin = data['admin_xp'].get(uid, 0)
+        total_gamble = data['gamble_points'].get(uid, 0)
+        total_xp = total_activity + total_admin
 
-    pts = data['user_points'].get(uid, 0)
-    rank = next((i+1 for i, (u, _) in enumerate(
-        sorted(data['user_points'].items(), key=lambda x: x[1], reverse=True)) if u == uid), None)
+        lvl, cur_xp, need_xp, remain, tier = level_info(total_xp)
+        prog = min(10, max(0, int(cur_xp / need_xp * 10)))
 
-    embed = Embed(title=f"{ctx.author.display_name}님의 포인트 & 레벨 정보", color=0x55CCFF)
-    embed.description = (
-        f"• 📈 진척도 : {bar}\n\n"
-        f"• 🏃🏻 레벨 : {get_rank(lvl)} ({lvl})\n"
-        f"• 🔼 다음 레벨까지 : {remain:,} 포인트\n"
-        f"• 📊 전체 랭킹 : {rank}위 / {len(data['user_points'])}명 중\n\n"
-        f"• 💰 총 보유 포인트 : {pts:,} 포인트\n"
-        f"   └ 활동 포인트 : {total_activity:,}\n"
-        f"   └ 관리자 지급 : {total_admin:,}\n"
-        f"   └ 도박 포인트 : {total_gamble:,}"
-    )
+        bar = "🟩" * prog + "⬛" * (10 - prog)
 
-    embed.set_thumbnail(url=ctx.author.display_avatar.url)
+        pts = data['user_points'].get(uid, 0)
 
+        embed = Embed(title=f"{name}님의 포인트 & 레벨 정보", color=0x55CCFF)
+        embed.description = (
+            f"• 📈 진척도 : {bar}\n\n"
+            f"• 🏃🏻 레벨 : {tier} ({lvl})\n"
+            f"• 🔼 다음 레벨까지 : {remain:,} 포인트\n"
+            f"• 📊 전체 랭킹 : {rank}위 / {ranked}명 중\n\n"
+            f"• 💰 총 보유 포인트 : {pts:,} 포인트\n"
+            f"   └ 활동 포인트 : {total_activity:,}\n"
+            f"   └ 관리자 지급 : {total_admin:,}\n"
+            f"   └ 도박 포인트 : {total_gamble:,}"
+        )
+
+        embed.set_thumbnail(url=avatar)
+        return embed
+
+    embed = renderer.user(("포인트", uid, store.version(uid), rank, ranked, name, avatar), build)
     await ctx.send(embed=embed)
 
 # ───── 관리자 수동 지급 ─────
@@ -384,10 +1900,8 @@ async def reset_data(ctx):
         await ctx.send("⛔ 이 명령은 관리자만 사용할 수 있습니다.")
         return
 
-    global data
-    data = DEFAULT_DATA.copy()
-    write_data(data)
-    await ctx.send("✅ 데이터가 초기화되었습니다.")
+    store.reset()
+    await ctx.send("✅ 포인트/통계 데이터가 초기화되었습니다. (재능상점·채널 설정·진행 중인 게임은 유지)")
 
 @bot.command()
 async def 지급(ctx, member: discord.Member, 점수: int):
@@ -395,30 +1909,37 @@ async def 지급(ctx, member: discord.Member, 점수: int):
         await ctx.send("🚫 관리자만 사용 가능합니다")
         return
 
-    data = read_data()
     uid = str(member.id)
-    data['user_points'][uid] = data['user_points'].get(uid, 0) + 점수
-    data['admin_xp'][uid] = data['admin_xp'].get(uid, 0) + 점수
+    await ledger.credit(uid, 점수, stats={'admin_xp': 점수})
 
-    write_data(data)
     await ctx.send(f"✅ {member.display_name}님에게 {점수}포인트 지급 완료!👍🏻")
 
 # ───── 구걸 시스템 ─────
+BEG_SUCCESS_CHANCE = 0.85
+BEG_GAIN = (10, 30)
+
+def roll_beg(rng: random.Random) -> int:
+    """구걸 결과 포인트 (실패 시 0)"""
+    if rng.random() < BEG_SUCCESS_CHANCE:
+        return rng.randint(*BEG_GAIN)
+    return 0
+
 @bot.command()
 async def 구걸(ctx):
-    data = read_data()
+    data = store.data
     uid = str(ctx.author.id)
     today = (datetime.datetime.utcnow() + datetime.timedelta(hours=9)).strftime("%Y-%m-%d")
 
-    data['beg_log'].setdefault(uid, [])
-    if data['beg_log'][uid].count(today) >= 5:
-        await ctx.send(f"❗ 하루 5번까지만 구걸할 수 있어요! (이미 {data['beg_log'][uid].count(today)}회 시도)")
+    counts = data['beg_log'].get(uid, {})
+    if counts.get(today, 0) >= 5:
+        await ctx.send(f"❗ 하루 5번까지만 구걸할 수 있어요! (이미 {counts[today]}회 시도)")
         return
+    # 횟수는 확인과 같은 틱에 기록 → 겹쳐 들어온 !구걸도 한도를 넘지 못함
+    store.set('beg_log', uid, count_beg(counts, today))
 
-    success = random.random() < 0.85
-    if success:
-        gain = random.randint(10, 30)
-        data['user_points'][uid] = data['user_points'].get(uid, 0) + gain
+    gain = roll_beg(GAME_RNG["구걸"])
+    if gain:
+        await ledger.credit(uid, gain)
         msg = f"🙏 {ctx.author.display_name}님이 구걸해서 {gain}포인트를 받았습니다!"
     else:
         fail_msgs = [
@@ -430,16 +1951,13 @@ async def 구걸(ctx):
             "코끼리가 '내가 다 쓸어갔다'라고 했습니다… 🐘",
             "유나대장이 슬쩍 가져갔다는 소문이… 😏",
         ]
-        reason = random.choice(fail_msgs)
+        reason = random.choice(fail_msgs)   # 문구만 고름 (결과와 무관)
         msg = f"{ctx.author.mention} ❌ 구걸 실패!\n{reason}"
 
-    data['beg_log'][uid].append(today)
-    write_data(data)
     await ctx.send(msg)
 
 # ───── 도움말 ─────
-@bot.command()
-async def 도움말(ctx):
+def build_help_embed():
     embed = discord.Embed(title="**메카살인기 • 솔라리스 봇 도움말**", color=0xFFA500)
     
     embed.add_field(
@@ -456,7 +1974,7 @@ async def 도움말(ctx):
     embed.add_field(name="📅 `!출석` : 하루 1회 출석 체크 및 보상 지급", 
                     value="└ `!출석현황` 으로 출석 진행 상황 확인 가능", inline=False)
     embed.add_field(name="💰 `!포인트` : 내 포인트, XP, 레벨 확인", value="", inline=False)
-    embed.add_field(name="🏆 `!랭킹` : 상위 10명 순위 확인", value="", inline=False)
+    embed.add_field(name="🏆 `!랭킹 [페이지]` : 상위 10명 순위 확인", value="", inline=False)
     embed.add_field(name="📊 `!평균` : 평균 인원 수, 총합, 1인 평균 확인", value="", inline=False)
     embed.add_field(name="🙏 `!구걸` : 하루 제한 횟수 내 추가 포인트 시도", value="", inline=False)
     embed.add_field(name="🎲 `!도박 금액` : 도박으로 포인트 배수 도전", value="", inline=False)
@@ -475,49 +1993,91 @@ async def 도움말(ctx):
     )
     
     embed.set_footer(text="메카살인기 • 솔라리스")
-    embed.set_thumbnail(url=ctx.me.display_avatar.url)
-    await ctx.send(embed=embed)
+    embed.set_thumbnail(url=bot.user.display_avatar.url)
+    return embed
+
+renderer.register_static("도움말", build_help_embed)
+
+@bot.command()
+async def 도움말(ctx):
+    await ctx.send(embed=renderer.static("도움말"))
 
 # ───── 도박 시스템 (최신 확률 적용) ─────
+GAMBLE_TABLE = [(58.5, 0), (94, 2), (99, 3), (100, 10)]   # (누적 확률 %, 배수) – 판돈을 먼저 걸고 배수만큼 돌려받음
+
+def roll_gamble(rng: random.Random) -> int:
+    """도박 배수 (0이면 실패)"""
+    chance = rng.uniform(0, 100)  # 실수 기반 분포
+    for edge, multiplier in GAMBLE_TABLE:
+        if chance < edge:
+            return multiplier
+    return GAMBLE_TABLE[-1][1]
+
 @bot.command()
 async def 도박(ctx, 배팅: int):
-    data = read_data()
     uid = str(ctx.author.id)
 
     if 배팅 <= 0:
         await ctx.send("❌ 배팅 금액은 1 이상이어야 합니다.")
         return
 
-    current_points = data['user_points'].get(uid, 0)
-    if current_points < 배팅:
+    # 판돈 차감, 당첨금, 도박 통계를 한 번의 증감으로 반영
+    def resolve():
+        multiplier = roll_gamble(GAME_RNG["도박"])
+        return multiplier, 배팅 * multiplier
+
+    def stats(multiplier, gain):
+        return {'gamble_points': gain} if gain else {'gamble_losses': 배팅}
+
+    settled = await ledger.wager(uid, 배팅, resolve, stats=stats)
+    if settled is None:
         await ctx.send("❌ 보유 포인트가 부족합니다.")
         return
+    multiplier, balance = settled
+    gain = 배팅 * multiplier
 
-    data['user_points'][uid] -= 배팅
-    chance = random.uniform(0, 100)  # 실수 기반 분포
-    gain = 0
-
-    if chance < 58.5:
+    if multiplier == 0:
         result_msg = f"💀 실패! {배팅:,}점 잃었습니다."
-        data['gamble_losses'][uid] = data['gamble_losses'].get(uid, 0) + 배팅
-    elif chance < 94:
-        gain = 배팅 * 2
+    elif multiplier == 2:
         result_msg = f"✨ 2배 당첨! {gain:,}점 획득!"
-    elif chance < 99:
-        gain = 배팅 * 3
+    elif multiplier == 3:
         result_msg = f"🎉 3배 당첨! {gain:,}점 획득!"
     else:
-        gain = 배팅 * 10
-        result_msg = f"🌟 10배 전설 당첨! {gain:,}점 획득!!"
-
-    data['user_points'][uid] += gain
-    if gain > 0:
-        data['gamble_points'][uid] = data['gamble_points'].get(uid, 0) + gain
-
-    write_data(data)
-
-    await ctx.send(f"{ctx.author.mention}\n{result_msg}\n💰 현재 보유 포인트: {data['user_points'][uid]:,}점")
-
+        result_msg = f"🌟 {multiplier}배 전설 당첨! {gain:,}점 획득!!"
+
+    await ctx.send(f"{ctx.author.mention}\n{result_msg}\n💰 현재 보유 포인트: {balance:,}점")
+
+
+# ───── 메시지 연출 (레이트 리밋 고려) ─────
+async def play_frames(message: discord.Message, count: int, render, tick: float, min_interval: float) -> int:
+    """미리 계산된 프레임 count개를 시간축(i번째 = 시작 후 i*tick초)에 맞춰 재생합니다.
+
+    편집은 min_interval 이상 간격으로만 보내고, 편집 응답이 늦으면 그 사이 프레임은 건너뛰고
+    현재 시점의 프레임으로 바로 넘어갑니다. 건너뛴 프레임은 render하지 않으며 마지막 프레임은 항상 보냅니다.
+    보낸 편집 횟수를 돌려줍니다.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    shown, last, edits = -1, None, 0
+    while shown < count - 1:
+        sent_at = loop.time()
+        idx = min(count - 1, int((sent_at - start) / tick))
+        if idx > shown:
+            content = render(idx)
+            if content != last:
+                try:
+                    await message.edit(content=content)
+                    edits += 1
+                except discord.HTTPException:
+                    pass  # 한 번 실패해도 다음 프레임에서 다시 시도
+                last = content
+            shown = idx
+        if shown >= count - 1:
+            break
+        now = loop.time()
+        next_frame = start + (shown + 1) * tick
+        await asyncio.sleep(max(sent_at + min_interval, next_frame) - now)
+    return edits
 
 # ───── 슬롯머신 시스템 애니메이션 풀버전 ─────
 
@@ -530,95 +2090,191 @@ OTHER_JACKPOT_CHANCE = 0.015
 
 EMOJIS = ["☀️", "🌙", "⭐", "🍀", "💣"]
 
+def spin_slot(rng: random.Random) -> list[str]:
+    """슬롯 최종 결과 (5칸)"""
+    chance = rng.random()
+    if chance < SOLAR_JACKPOT_CHANCE:
+        return ["☀️"] * 5
+    if chance < OTHER_JACKPOT_CHANCE:
+        return [rng.choice(EMOJIS[1:])] * 5
+    while True:
+        result = [rng.choice(EMOJIS) for _ in range(5)]
+        if len(set(result)) > 1:
+            return result
+
+def slot_payout(result: list[str], jackpot: int) -> int:
+    """5개가 모두 같으면 잭팟의 JACKPOT_REWARD_RATIO (+ 솔라 보너스), 아니면 0"""
+    if len(set(result)) != 1:
+        return 0
+    reward = int(jackpot * JACKPOT_REWARD_RATIO)
+    if result[0] == "☀️":
+        reward += SOLAR_JACKPOT_BONUS
+    return reward
+
+SLOT_MAX_SPINS = 20        # !슬롯 N 최대 회전 수
+SLOT_ANIM_ROLLS = 2        # 최종 결과 전 연출 프레임 수
+SLOT_ANIM_TICK = 0.4       # 연출 프레임 간격(초) – 편집도 이 간격 이상으로만 보냄
+
+class JackpotService:
+    """서버별 슬롯 잭팟 풀.
+
+    적립은 store.add 한 번(저널 한 줄 / SQLite 카운터 증가)이고, 지급은 compare-and-swap으로
+    호출자가 본 적립액이 그대로일 때만 0으로 되돌립니다. 다른 회전이 먼저 가져갔으면 False를 돌려주므로
+    같은 잭팟이 두 번 지급되지 않습니다. 예전 전역 slot_bets는 처음 쓰는 서버로 한 번 옮깁니다.
+    """
+
+    def __init__(self, store: DataStore, base: int = BASE_JACKPOT):
+        self.store = store
+        self.base = base
+
+    @staticmethod
+    def key(guild_id) -> str:
+        return str(guild_id or 0)   # DM은 0번 풀
+
+    def _adopt_legacy(self, key):
+        legacy = self.store.data.get("slot_bets", 0)
+        if legacy and key not in self.store.data["slot_jackpots"]:
+            self.store.add("slot_jackpots", key, legacy)
+            self.store.set("slot_bets", None, 0)
+
+    def pot(self, guild_id) -> int:
+        key = self.key(guild_id)
+        self._adopt_legacy(key)
+        return self.store.get("slot_jackpots", key)
+
+    def total(self, guild_id) -> int:
+        return self.base + self.pot(guild_id)
+
+    def contribute(self, guild_id, amount: int) -> int:
+        """적립하고 새 적립액을 돌려줍니다."""
+        key = self.key(guild_id)
+        self._adopt_legacy(key)
+        return self.store.add("slot_jackpots", key, amount)
+
+    def award(self, guild_id, expected: int) -> bool:
+        """적립액이 아직 expected일 때만 비우고 True (compare-and-swap)"""
+        key = self.key(guild_id)
+        if self.store.get("slot_jackpots", key) != expected:
+            return False
+        self.store.set("slot_jackpots", key, 0)
+        return True
+
+jackpots = JackpotService(store)
+
+class SlotSpin(NamedTuple):
+    result: list[str]
+    reward: int
+    jackpot: int    # 이 회전 시점의 누적 잭팟
+
+def run_slot_spins(count: int, rng: random.Random, guild_id) -> list[SlotSpin]:
+    """count번 회전을 한 번에 정산합니다 (서버 잭팟에 적립 → 당첨 시 compare-and-swap으로 수령)."""
+    spins = []
+    for _ in range(count):
+        pot = jackpots.contribute(guild_id, BET_AMOUNT)
+        result = spin_slot(rng)
+        reward = slot_payout(result, jackpots.base + pot)
+        while reward and not jackpots.award(guild_id, pot):
+            pot = jackpots.pot(guild_id)   # 다른 회전이 먼저 바꿨으면 현재 적립액 기준으로 다시
+            reward = slot_payout(result, jackpots.base + pot)
+        spins.append(SlotSpin(result, reward, jackpots.base + pot))
+    return spins
+
+slot_animating: set[int] = set()   # 연출이 진행 중인 채널 – 채널당 한 번에 하나만 돌려 채널 편집 한도를 지킴
+
+def slot_animation_on(channel_id) -> bool:
+    return str(channel_id) not in store.data["slot_quiet_channels"]
+
 @bot.command()
-async def 슬롯(ctx):
-    data = read_data()
+async def 슬롯(ctx, 횟수: str = None, 설정: str = None):
     uid = str(ctx.author.id)
 
-    # 유저 포인트 확인
-    if data['user_points'].get(uid, 0) < BET_AMOUNT:
-        await ctx.send("❌ 포인트 부족 (10포인트 필요)")
-        return
-
-    # 누적 베팅 초기화 (최초 1회)
-    if "slot_bets" not in data:
-        data['slot_bets'] = 0
-
-    # 베팅 반영
-    data['user_points'][uid] -= BET_AMOUNT
-    data['slot_bets'] += BET_AMOUNT
-
-    # 잭팟 현재금 계산
-    current_jackpot = BASE_JACKPOT + data['slot_bets']
-
-    # 결과 미리 결정
-    chance = random.random()
-    if chance < SOLAR_JACKPOT_CHANCE:
-        final_result = ["☀️"] * 5
-    elif chance < OTHER_JACKPOT_CHANCE:
-        sym = random.choice(EMOJIS[1:])
-        final_result = [sym] * 5
+    # ── 채널별 연출 켜기/끄기 ──
+    if 횟수 == "연출":
+        if 설정 not in ("켜기", "끄기"):
+            state = "켜짐" if slot_animation_on(ctx.channel.id) else "꺼짐"
+            return await ctx.send(f"🎰 이 채널의 슬롯 연출: **{state}** (`!슬롯 연출 켜기|끄기`)")
+        perms = getattr(ctx.author, "guild_permissions", None)
+        if uid not in ALLOWED_ADMIN_IDS and not (perms and perms.manage_channels):
+            return await ctx.send("⛔ 채널 관리 권한이 있는 사람만 바꿀 수 있습니다.")
+        if 설정 == "끄기":
+            store.set("slot_quiet_channels", str(ctx.channel.id), True)
+        elif not slot_animation_on(ctx.channel.id):
+            store.delete("slot_quiet_channels", str(ctx.channel.id))
+        return await ctx.send(f"🎰 이 채널의 슬롯 연출을 {'껐' if 설정 == '끄기' else '켰'}습니다.")
+
+    if 횟수 is None:
+        count = 1
+    elif 횟수.isdigit() and 1 <= int(횟수) <= SLOT_MAX_SPINS:
+        count = int(횟수)
     else:
-        while True:
-            final_result = [random.choice(EMOJIS) for _ in range(5)]
-            if len(set(final_result)) > 1:
-                break
+        return await ctx.send(f"❗ 형식: `!슬롯 [횟수 1~{SLOT_MAX_SPINS}]` / `!슬롯 연출 켜기|끄기`")
 
-    # 🎰 애니메이션 (4회 초고속 회전)
-    rolling_msg = await ctx.send("🎰 슬롯머신 작동중...")
+    # 결과와 잔액을 I/O 전에 한 번에 확정 (베팅 차감 + 당첨금 = 증감 한 번)
+    stake = BET_AMOUNT * count
+    guild_id = ctx.guild.id if ctx.guild else None
 
-    for _ in range(4):
-        roll = [random.choice(EMOJIS) for _ in range(5)]
-        display = f"🎰 | {' '.join(roll)}"
-        await rolling_msg.edit(content=display)
-        await asyncio.sleep(0.1)
+    def resolve():
+        spins = run_slot_spins(count, GAME_RNG["슬롯"], guild_id)
+        return spins, sum(spin.reward for spin in spins)
 
-    await asyncio.sleep(0.2)
-    await rolling_msg.edit(content=f"🎯 최종 결과 | {' '.join(final_result)}")
-    await asyncio.sleep(0.4)
-
-    # 결과 계산
-    common = max(set(final_result), key=final_result.count)
-    cnt = final_result.count(common)
+    settled = await ledger.wager(uid, stake, resolve)
+    if settled is None:
+        await ctx.send(f"❌ 포인트 부족 ({stake}포인트 필요)")
+        return
+    spins, balance = settled
 
     lines = []
-
-    if cnt == 5:
-        reward = int(current_jackpot * JACKPOT_REWARD_RATIO)
-        bonus_msg = ""
-
-        if common == "☀️":
-            reward += SOLAR_JACKPOT_BONUS
-            bonus_msg = "☀️ **솔라잭팟! 추가 보너스 500포인트!**"
-
-        data['user_points'][uid] += reward
-
-        lines.append(f"🎉 **{common} 5개 잭팟 당첨! {reward:,}포인트 획득!**")
-        if bonus_msg:
-            lines.append(bonus_msg)
-
-        # 잭팟 완전 초기화
-        data['slot_bets'] = 0
-
+    if count == 1:
+        spin = spins[0]
+        common = spin.result[0]
+        if spin.reward:
+            lines.append(f"🎉 **{common} 5개 잭팟 당첨! {spin.reward:,}포인트 획득!**")
+            if common == "☀️":
+                lines.append("☀️ **솔라잭팟! 추가 보너스 500포인트!**")
+        else:
+            pot = spin.jackpot - BASE_JACKPOT
+            lines.append("💀 꽝! 누적 상금은 계속 쌓입니다...")
+            lines.append(f"💸 누적 잭팟 : {BASE_JACKPOT} + {pot:,} = {spin.jackpot:,}포인트")
+            lines.append(f"💰 남은 내 포인트 : {balance:,}포인트")
     else:
-        lines.append("💀 꽝! 누적 상금은 계속 쌓입니다...")
-        lines.append(f"💸 누적 잭팟 : {BASE_JACKPOT} + {data['slot_bets']:,} = {current_jackpot:,}포인트")
-        lines.append(f"💰 남은 내 포인트 : {data['user_points'][uid]:,}포인트")
-
-    write_data(data)
+        won = sum(spin.reward for spin in spins)
+        for i, spin in enumerate(spins, start=1):
+            tail = f"🎉 잭팟 +{spin.reward:,}" if spin.reward else "꽝"
+            lines.append(f"`{i:>2}` {' '.join(spin.result)} → {tail}")
+        lines.append("")
+        lines.append(f"🎟️ {count}회 · 베팅 {stake:,} · 획득 {won:,} · 손익 {won - stake:+,}포인트")
+        lines.append(f"💸 누적 잭팟 : {jackpots.total(guild_id):,}포인트")
+        lines.append(f"💰 남은 내 포인트 : {balance:,}포인트")
 
     embed = discord.Embed(
-        title=f"🎰 [{ctx.author.display_name}님의 슬롯 결과]",
+        title=f"🎰 [{ctx.author.display_name}님의 슬롯 결과]" + (f" ×{count}" if count > 1 else ""),
         description="\n".join(lines),
         color=0xf1c40f
     )
     embed.set_thumbnail(url=ctx.author.display_avatar.url)
-    await ctx.send(embed=embed)
+
+    final = f"🎯 최종 결과 | {' '.join(spins[-1].result)}"
+    if count > 1 or not slot_animation_on(ctx.channel.id) or ctx.channel.id in slot_animating:
+        await ctx.send(content=final if count == 1 else None, embed=embed)
+        return
+
+    # 🎰 연출 (정산은 이미 끝남) – 편집 간격을 지키고, 늦어지면 중간 프레임은 건너뜀.
+    # 같은 채널에서 이미 연출 중이면 위에서 결과만 바로 보냄 (겹친 연출이 채널 편집 한도를 넘지 않도록)
+    slot_animating.add(ctx.channel.id)
+    try:
+        rolls = [f"🎰 | {' '.join(random.choice(EMOJIS) for _ in range(5))}"   # 연출용 (결과 난수열과 분리)
+                 for _ in range(SLOT_ANIM_ROLLS)]
+        rolling_msg = await ctx.send("🎰 슬롯머신 작동중...")
+        await play_frames(rolling_msg, len(rolls), lambda i: rolls[i], tick=SLOT_ANIM_TICK, min_interval=SLOT_ANIM_TICK)
+        await asyncio.sleep(SLOT_ANIM_TICK)
+        with contextlib.suppress(discord.HTTPException):
+            await rolling_msg.edit(content=final, embed=embed)
+    finally:
+        slot_animating.discard(ctx.channel.id)
 
 # ───── 보내기 시스템 ─────
 @bot.command()
 async def 보내기(ctx, member: discord.Member, 금액: int):
-    data = read_data()
     sender_id = str(ctx.author.id)
     receiver_id = str(member.id)
 
@@ -630,21 +2286,57 @@ async def 보내기(ctx, member: discord.Member, 금액: int):
         await ctx.send("❗ 자신에게는 보낼 수 없습니다.")
         return
 
-    if data['user_points'].get(sender_id, 0) < 금액:
+    if not await ledger.transfer(sender_id, receiver_id, 금액):
         await ctx.send("😢 포인트가 부족합니다.")
         return
 
-    data['user_points'][sender_id] -= 금액
-    data['user_points'][receiver_id] = data['user_points'].get(receiver_id, 0) + 금액
-
-    write_data(data)
     await ctx.send(f"📤 {ctx.author.display_name}님이 {member.display_name}님에게 {금액:,}포인트를 보냈습니다!")
 
 # ───── 재능상점 통합 ─────
+def build_talent_help_embed():
+    embed = discord.Embed(
+        title="🌞 솔라 재능상점 도움말",
+        description="재능상점은 솔라리스 클랜원들의 다양한 재능을 \n포인트로 사고 파는 거래 시스템입니다.",
+        color=0x00ffcc
+    )
+    embed.set_thumbnail(url=bot.user.display_avatar.url)
+    embed.add_field(
+        name="🛒 상품 등록 (본인만 가능)",
+        value="`!재능상점 등록 @판매자 (상품명) 가격`\n예: `!재능상점 등록 @판매자 (썸네일 제작) 30`",
+        inline=False
+    )
+    embed.add_field(
+        name="📦 내 상점 관리/삭제",
+        value="`!재능상점 관리`\n`!재능상점 관리 @판매자 (상품명) 삭제`",
+        inline=False
+    )
+    embed.add_field(
+        name="🛍️ 전체 상품 구경",
+        value="`!재능상점 구경 [@판매자] [최소-최대]`\n예: `!재능상점 구경 10-50` (◀ ▶ 버튼으로 페이지 이동)",
+        inline=False
+    )
+    embed.add_field(
+        name="🔍 상품 검색",
+        value="`!재능상점 검색 검색어`\n예: `!재능상점 검색 썸네일` / 초성 `!재능상점 검색 ㅆㄴㅇ`",
+        inline=False
+    )
+    embed.add_field(
+        name="🎯 상품 구매",
+        value="`!재능상점 구매 @판매자 (상품명)`\n예: `!재능상점 구매 @희카츄/97 (썸네일 제작)`",
+        inline=False
+    )
+    embed.add_field(
+        name="⚠️ 참고사항",
+        value="• 등록은 본인만 가능하며 @멘션 ❌\n• 구매 시에만 @멘션 필요 ✅\n• 상품명은 반드시 괄호 `( )` 안에 작성",
+        inline=False
+    )
+    return embed
+
+renderer.register_static("재능상점도움말", build_talent_help_embed)
+
 @bot.command()
-async def 재능상점(ctx, action=None, seller: discord.Member = None, *, args=None):
+async def 재능상점(ctx, action=None, seller: Optional[discord.Member] = None, *, args=None):
     user_id = str(ctx.author.id)
-    store = load_talent_store()
 
     # ── 등록 ──
     if action == "등록":
@@ -659,13 +2351,15 @@ async def 재능상점(ctx, action=None, seller: discord.Member = None, *, args=
         if not name or price is None:
             return await ctx.send("❗ 상품명은 `( )` 안에, 가격은 숫자로 입력해 주세요.")
 
-        store.setdefault(user_id, {"items": []})["items"].append({"name": name, "price": price})
-        save_talent_store(store)
-        await ctx.send(f"✅ 상품 '**{name}**'이 등록되었습니다. 가격: {price}코인")
+        if catalog.register(user_id, name, price):
+            await ctx.send(f"✅ 상품 '**{name}**'이 등록되었습니다. 가격: {price}코인")
+        else:
+            await ctx.send(f"✅ 이미 있는 상품 '**{name}**'의 가격을 {price}코인으로 변경했습니다.")
 
     # ── 관리 ──
     elif action == "관리":
-        if user_id not in store or not store[user_id]["items"]:
+        my_items = catalog.seller_items(user_id)
+        if not my_items:
             return await ctx.send("📦 등록된 상품이 없습니다.")
 
         if args and args.endswith(" 삭제"):
@@ -673,44 +2367,61 @@ async def 재능상점(ctx, action=None, seller: discord.Member = None, *, args=
             if not m:
                 return await ctx.send("❗ 삭제 형식: `!재능상점 관리 (상품명) 삭제`")
             target = m.group(1).strip()
-            before = len(store[user_id]["items"])
-            store[user_id]["items"] = [it for it in store[user_id]["items"] if it["name"] != target]
-            save_talent_store(store)
-            return await ctx.send(
-                f"🗑️ {'삭제 완료!' if len(store[user_id]['items']) < before else '해당 상품이 없습니다.'}"
-            )
+            removed = catalog.remove(user_id, target)
+            return await ctx.send(f"🗑️ {'삭제 완료!' if removed else '해당 상품이 없습니다.'}")
 
         embed = discord.Embed(title="🗂️ 내 상점 상품 목록", color=discord.Color.blue())
-        lines = [f"{i+1}. **{it['name']}** — {it['price']}코인"
-                 for i, it in enumerate(store[user_id]["items"])]
+        lines = [f"{i+1}. **{it.name}** — {it.price}코인"
+                 for i, it in enumerate(my_items)]
         embed.description = "\n".join(lines)
         await ctx.send(embed=embed)
 
     # ── 구경 ──
     elif action == "구경":
-        if not store:
+        if ctx.guild is None:
+            return await ctx.send("❗ 구경은 서버 채널에서만 사용할 수 있습니다. (판매자 확인에 서버 멤버 정보가 필요)")
+        if not catalog:
             return await ctx.send("📭 현재 등록된 상점이 없습니다.")
 
-        embed = discord.Embed(title="🛍️ 전체 재능상점 목록", color=discord.Color.green())
-        count = 1
-
-        for sid, info in store.items():
-            member = ctx.guild.get_member(int(sid))
-            if not member or not info['items']:
-                continue
-            for item in info['items']:
-                embed.add_field(
-                    name=f"{count}. **{item['name']}**",
-                    value=(
-                        f"• 👤 판매자: {member.display_name}\n"
-                        f"• 💰 가격: {item['price']}코인"
-                    ),
-                    inline=False
-                )
-                count += 1
-
-        if count == 1:
-            return await ctx.send("📭 현재 등록된 상품이 없습니다.")
+        min_price = max_price = None
+        if args:
+            price_range = parse_price_range(args)
+            if price_range is None:
+                return await ctx.send("❗ 형식: `!재능상점 구경 [@판매자] [최소-최대]` (예: `!재능상점 구경 10-50`)")
+            min_price, max_price = price_range
+        query = (str(seller.id) if seller else None, min_price, max_price)
+
+        if not talent_browser.rows(ctx.guild, query):
+            return await ctx.send("📭 조건에 맞는 상품이 없습니다." if args or seller else "📭 현재 등록된 상품이 없습니다.")
+
+        embed = talent_browser.page(ctx.guild, query, 1)
+        if talent_browser.page_count(ctx.guild, query) == 1:
+            return await ctx.send(embed=embed)
+        view = TalentBrowseView(ctx.author.id, ctx.guild, query)
+        view.message = await ctx.send(embed=embed, view=view)
+
+    # ── 검색 ──
+    elif action == "검색":
+        # 검색어가 멤버 이름과 겹치면 seller로 변환될 수 있으므로 원문에서 직접 가져옴
+        parts = ctx.message.content.split(None, 2)
+        query = parts[2].strip() if len(parts) > 2 else ""
+        if not query:
+            return await ctx.send("❗ 형식: `!재능상점 검색 검색어` (초성 검색 가능, 예: `!재능상점 검색 ㅆㄴㅇ`)")
+        if ctx.guild is None:
+            return await ctx.send("❗ 검색은 서버 채널에서만 사용할 수 있습니다. (판매자 확인에 서버 멤버 정보가 필요)")
+
+        found = talent_search.search(query)
+        members = seller_members(ctx.guild, {it.seller_id for it in found})   # 판매자마다 한 번만 조회
+        hits = [it for it in found if members[it.seller_id]]
+        if not hits:
+            return await ctx.send(f"🔍 '{query}'에 해당하는 상품이 없습니다.")
+
+        lines = []
+        for i, item in enumerate(hits[:TALENT_PAGE_SIZE], start=1):
+            lines.append(f"**{i}. {item.name[:TALENT_NAME_MAX]}**\n• 👤 {members[item.seller_id].display_name} • 💰 {item.price}코인")
+        embed = discord.Embed(title=f"🔍 '{query[:50]}' 검색 결과", description="\n".join(lines), color=discord.Color.green())
+        more = f" (상위 {TALENT_PAGE_SIZE}개 표시)" if len(hits) > TALENT_PAGE_SIZE else ""
+        embed.set_footer(text=f"상품 {len(hits)}개{more} • 구매: !재능상점 구매 @판매자 (상품명)")
         await ctx.send(embed=embed)
 
      # ── 구매 ──
@@ -724,24 +2435,19 @@ async def 재능상점(ctx, action=None, seller: discord.Member = None, *, args=
         item_name = m.group(1).strip()
 
         seller_id = str(seller.id)
-        if seller_id not in store or not store[seller_id]["items"]:
+        if not catalog.seller_items(seller_id):
             return await ctx.send("❌ 판매자의 상점이 비어 있습니다.")
 
-        item = next((it for it in store[seller_id]["items"] if it["name"] == item_name), None)
+        item = catalog.get(seller_id, item_name)
         if not item:
             return await ctx.send(f"❌ '{item_name}' 상품이 없습니다.")
 
-        data = read_data()
         buyer_id = str(ctx.author.id)
-        price = item["price"]
+        price = item.price
 
-        if data["user_points"].get(buyer_id, 0) < price:
+        if not await ledger.transfer(buyer_id, seller_id, price):
             return await ctx.send("😢 포인트가 부족합니다.")
 
-        data["user_points"][buyer_id] -= price
-        data["user_points"][seller_id] = data["user_points"].get(seller_id, 0) + price
-        write_data(data)
-
         await ctx.send(f"✅ {ctx.author.display_name}님이 {seller.display_name}님의 '**{item_name}**' 상품을 {price}코인에 구매했습니다!")
 
         try:
@@ -759,38 +2465,7 @@ async def 재능상점(ctx, action=None, seller: discord.Member = None, *, args=
 
     # ── 도움말 ──
     elif action == "도움말":
-        embed = discord.Embed(
-            title="🌞 솔라 재능상점 도움말",
-            description="재능상점은 솔라리스 클랜원들의 다양한 재능을 \n포인트로 사고 파는 거래 시스템입니다.",
-            color=0x00ffcc
-        )
-        embed.set_thumbnail(url=ctx.bot.user.avatar.url)
-        embed.add_field(
-            name="🛒 상품 등록 (본인만 가능)",
-            value="`!재능상점 등록 @판매자 (상품명) 가격`\n예: `!재능상점 등록 @판매자 (썸네일 제작) 30`",
-            inline=False
-        )
-        embed.add_field(
-            name="📦 내 상점 관리/삭제",
-            value="`!재능상점 관리`\n`!재능상점 관리 @판매자 (상품명) 삭제`",
-            inline=False
-        )
-        embed.add_field(
-            name="🛍️ 전체 상품 구경",
-            value="`!재능상점 구경`",
-            inline=False
-        )
-        embed.add_field(
-            name="🎯 상품 구매",
-            value="`!재능상점 구매 @판매자 (상품명)`\n예: `!재능상점 구매 @희카츄/97 (썸네일 제작)`",
-            inline=False
-        )
-        embed.add_field(
-            name="⚠️ 참고사항",
-            value="• 등록은 본인만 가능하며 @멘션 ❌\n• 구매 시에만 @멘션 필요 ✅\n• 상품명은 반드시 괄호 `( )` 안에 작성",
-            inline=False
-        )
-        await ctx.send(embed=embed)
+        await ctx.send(embed=renderer.static("재능상점도움말"))
 
     # ── 잘못된 입력 ──
     else:
@@ -798,29 +2473,35 @@ async def 재능상점(ctx, action=None, seller: discord.Member = None, *, args=
             "**사용법 요약:**\n"
             "`!재능상점 등록 @판매자 (상품명) 가격`\n"
             "`!재능상점 관리 @판매자 [(상품명) 삭제]`\n"
-            "`!재능상점 구경`\n"
+            "`!재능상점 구경 [@판매자] [최소-최대]`\n"
+            "`!재능상점 검색 검색어`\n"
             "`!재능상점 구매 @판매자 (상품명)`\n"
             "`!재능상점 도움말`"
         )
 
 # ───── 랭킹 시스템 ─────
 @bot.command()
-async def 랭킹(ctx):
-    data = read_data()
-    if not data['user_points']:
+async def 랭킹(ctx, 페이지: int = 1):
+    if not len(leaderboard):
         await ctx.send("📉 아직 데이터가 없습니다.")
         return
 
-    sorted_users = sorted(data['user_points'].items(), key=lambda x: x[1], reverse=True)
-    top10 = sorted_users[:10]
-    desc = "\n".join(f"**{i+1}.** <@{uid}> — {pt:,}포인트" for i, (uid, pt) in enumerate(top10))
+    pages = leaderboard.page_count()
+    if not 1 <= 페이지 <= pages:
+        return await ctx.send(f"❗ 페이지는 1~{pages} 사이로 입력해주세요.")
+
+    offset = (페이지 - 1) * 10
+    desc = "\n".join(f"**{offset+i+1}.** <@{uid}> — {pt:,}포인트"
+                     for i, (uid, pt) in enumerate(leaderboard.top(10, offset)))
 
-    embed = Embed(title="**🌞 TOP 10 랭킹**", description=desc, color=0xFFD700)
+    title = "**🌞 TOP 10 랭킹**" if 페이지 == 1 else f"**🌞 랭킹 {offset+1}~{offset+10}위**"
+    embed = Embed(title=title, description=desc, color=0xFFD700)
+    embed.set_footer(text=f"{페이지}/{pages} 페이지 • `!랭킹 <페이지>`로 더 보기")
     await ctx.send(embed=embed)
 
 @bot.command()
 async def 평균(ctx):
-    data = read_data()
+    data = store.data
     if not data['user_points']:
         await ctx.send("📉 아직 데이터가 없습니다.")
         return
@@ -828,10 +2509,14 @@ async def 평균(ctx):
     total = sum(data['user_points'].values())
     cnt = len(data['user_points'])
     avg = total // cnt
+    activity, admin = data['activity_xp'], data['admin_xp']
+    levels = level_info_many(activity.get(uid, 0) + admin.get(uid, 0) for uid in data['user_points'])
+    avg_level = sum(info.level for info in levels) / cnt
     desc = (
         f"• **인원 수**: {cnt}명\n"
         f"• **총합**: {total:,}점\n"
-        f"• **1인 평균**: {avg:,}점"
+        f"• **1인 평균**: {avg:,}점\n"
+        f"• **평균 레벨**: {avg_level:.1f}"
     )
     embed = Embed(title="**📈 전체 평균 포인트**", description=desc, color=0x00AAFF)
     await ctx.send(embed=embed)
@@ -839,154 +2524,327 @@ async def 평균(ctx):
 # ───────────경마 게임 ──────────────
 TRACK_LEN = 25
 TICK_SEC  = 0.25
-REFRESH_EVERY = 1
+RACE_EDIT_INTERVAL = 1.2   # 메시지 편집 최소 간격(초) – 채널당 편집 레이트 리밋(5회/5초) 아래로 유지
 HORSE_ICONS = ["🏇", "🐂", "🐉", "🦓", "🐐", "🐖", "🐪"]
 
-horse_race_state = {
-    "horses": [],
-    "positions": [],
-    "is_running": False,
-    "bettors": {},    # {uid: (horse_idx, amount)}
-    "pool": 0,
-    "msg": None
-}
+class RaceResult(NamedTuple):
+    frames: list[tuple[int, ...]]   # 틱마다의 말 위치 (frames[0]은 출발선)
+    order: list[int]                # 도착 순서 (말 인덱스)
+    seed: int
+
+def simulate_race(n_horses: int, seed: int) -> RaceResult:
+    """경주 전체를 시드로 미리 계산 (화면 갱신과 무관하게 결과가 먼저 정해짐)"""
+    rng = random.Random(seed)
+    momentums = [rng.uniform(0.8, 1.2) for _ in range(n_horses)]
+    positions = [0] * n_horses
+    frames = [tuple(positions)]
+    finished, order = set(), []
+    while len(finished) < n_horses:
+        for idx in range(n_horses):
+            if idx in finished:
+                continue
+            condition = rng.uniform(0.9, 1.1) * momentums[idx]
+            weights = [1*condition, 2.5, 3.5*(2-condition), 1.5]
+            step = rng.choices([0,1,2,3], weights=weights)[0]
+            positions[idx] += step
+            if positions[idx] >= TRACK_LEN:
+                finished.add(idx)
+                order.append(idx)
+        frames.append(tuple(positions))
+    return RaceResult(frames, order, seed)
+
+def render_race_frame(horses, positions) -> str:
+    lines=[]
+    for i,(name,pos) in enumerate(zip(horses,positions)):
+        icon = HORSE_ICONS[i%len(HORSE_ICONS)]
+        bar  = "."*min(pos,TRACK_LEN)+icon+"."*(TRACK_LEN-min(pos,TRACK_LEN))
+        lines.append(f"{i+1}|{bar[:TRACK_LEN]}| {name}")
+    return "```\n"+"\n".join(lines)+"\n```"
+
+RACE_HOUSE_EDGE_DEFAULT = 0.05
+
+def parse_house_edge(raw: str | None) -> float:
+    """RACE_HOUSE_EDGE 환경변수 → [0, 1) 범위의 하우스 몫.
+    숫자가 아니면 기본값, 범위를 벗어나면 잘라 냄 (1 이상이면 지급 풀이 0 이하가 되어 음수 지급이 생김)"""
+    try:
+        edge = float(raw) if raw is not None else RACE_HOUSE_EDGE_DEFAULT
+    except ValueError:
+        print(f"❗ RACE_HOUSE_EDGE={raw!r} 을(를) 해석할 수 없어 기본값 {RACE_HOUSE_EDGE_DEFAULT}를 사용합니다.")
+        return RACE_HOUSE_EDGE_DEFAULT
+    if not 0 <= edge < 1:   # NaN도 여기서 걸림
+        clamped = RACE_HOUSE_EDGE_DEFAULT if math.isnan(edge) else min(max(edge, 0.0), 0.99)
+        print(f"❗ RACE_HOUSE_EDGE={raw!r} 은(는) 0 이상 1 미만이어야 합니다. {clamped}를 사용합니다.")
+        return clamped
+    return edge
+
+RACE_HOUSE_EDGE = parse_house_edge(os.environ.get("RACE_HOUSE_EDGE"))   # 판돈에서 떼는 몫 [0, 1)
+RACE_IDLE_TIMEOUT = 600    # 입장 후 이 시간(초) 동안 시작/배팅이 없으면 배팅을 돌려주고 정리
+RACE_SWEEP_INTERVAL = 60
+
+class ParimutuelPool:
+    """경마 배팅 풀 (패리뮤추얼).
+
+    말별 배팅 합계와 전체 풀을 배팅이 들어올 때마다 갱신하므로 배당률 계산은 O(1)입니다.
+    정산 시 하우스 몫(edge)을 뗀 풀을 우승 말 배팅액 비율대로 나눕니다 (1포인트 미만은 버림).
+    """
+
+    def __init__(self, n_horses: int, edge: float = RACE_HOUSE_EDGE):
+        self.edge = edge
+        self.totals = [0] * n_horses
+        self.total = 0
+        self.stakes: dict[str, dict[int, int]] = {}   # {uid: {horse_idx: 금액}}
+
+    def __bool__(self):
+        return self.total > 0
+
+    def place(self, uid: str, horse: int, amount: int):
+        self.totals[horse] += amount
+        self.total += amount
+        user = self.stakes.setdefault(uid, {})
+        user[horse] = user.get(horse, 0) + amount
+
+    def cancel(self, uid: str, horse: int, amount: int):
+        self.totals[horse] -= amount
+        self.total -= amount
+        user = self.stakes[uid]
+        user[horse] -= amount
+        if not user[horse]:
+            del user[horse]
+            if not user:
+                del self.stakes[uid]
+
+    @property
+    def net(self) -> float:
+        return self.total * (1 - self.edge)
+
+    def odds(self, horse: int) -> float | None:
+        """1포인트당 돌려받는 배수 (그 말에 배팅이 없으면 None)"""
+        return self.net / self.totals[horse] if self.totals[horse] else None
+
+    def payouts(self, winner: int) -> dict[str, int]:
+        """우승 말 배팅자별 지급액. 우승 말에 아무도 걸지 않았으면 전원 원금 환불."""
+        if not self.totals[winner]:
+            return {uid: sum(bets.values()) for uid, bets in self.stakes.items()}
+        rate = self.net / self.totals[winner]
+        return {uid: int(bets[winner] * rate) for uid, bets in self.stakes.items() if bets.get(winner)}
+
+class HorseRace:
+    """채널 하나의 경주 상태 – 배팅 판돈은 ledger 에스크로(hold_id)에 묶어 둠"""
+
+    def __init__(self, key, host_id: str, horses: list[str], channel):
+        self.key = key
+        self.host_id = host_id
+        self.horses = horses
+        self.channel = channel
+        self.pool = ParimutuelPool(len(horses))
+        self.is_running = False
+        self.closed = False
+        self.task: asyncio.Task | None = None
+        self.hold_id = f"race:{key[0]}:{key[1]}:{time.time_ns()}"
+        self.last_active = time.monotonic()
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+def log_task_failure(task: asyncio.Task):
+    """create_task로 띄워 두고 기다리지 않는 태스크의 done 콜백 – 예외로 끝났으면 트레이스백을 남김"""
+    if task.cancelled() or task.exception() is None:
+        return
+    print(f"❗ 백그라운드 작업 실패: {task.get_name()}")
+    traceback.print_exception(task.exception())
+
+class RaceRegistry:
+    """(서버, 채널)별 경주 목록. 경주마다 자기 태스크로 진행되므로 채널끼리 서로 기다리지 않습니다."""
+
+    def __init__(self, ledger: Ledger):
+        self.ledger = ledger
+        self.races: dict[tuple, HorseRace] = {}
+        self._sweeper: asyncio.Task | None = None
+
+    @staticmethod
+    def key_of(ctx) -> tuple:
+        return (ctx.guild.id if ctx.guild else None, ctx.channel.id)
+
+    def get(self, ctx) -> HorseRace | None:
+        return self.races.get(self.key_of(ctx))
+
+    def open(self, ctx, horses: list[str]) -> HorseRace:
+        key = self.key_of(ctx)
+        race = self.races[key] = HorseRace(key, str(ctx.author.id), horses, ctx.channel)
+        return race
+
+    def start(self):
+        if not self._sweeper or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_loop(), name="경마 정리")
+            self._sweeper.add_done_callback(log_task_failure)
+
+    async def close(self, race: HorseRace, refund: bool):
+        """경주를 목록에서 빼고, refund면 묶어 둔 배팅을 모두 돌려줍니다."""
+        race.closed = True
+        if self.races.get(race.key) is race:
+            del self.races[race.key]
+        if race.task and race.task is not asyncio.current_task():
+            race.task.cancel()
+        if refund:
+            await self.ledger.refund(race.hold_id)
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(RACE_SWEEP_INTERVAL)
+            now = time.monotonic()
+            for race in list(self.races.values()):
+                if not race.is_running and now - race.last_active > RACE_IDLE_TIMEOUT:
+                    await self.close(race, refund=True)
+                    with contextlib.suppress(discord.HTTPException):
+                        await race.channel.send("⌛ 오래 시작되지 않은 경마를 정리했습니다. 배팅 포인트는 모두 돌려드렸어요.")
+
+races = RaceRegistry(ledger)
+
+async def run_race(race: HorseRace):
+    """경주 하나를 끝까지 진행하고 정산합니다 (경주별 태스크)"""
+    horses = race.horses
+    settled = False
+    try:
+        result = simulate_race(len(horses), GAME_RNG["경마"].getrandbits(32))   # 결과를 먼저 확정
+        track_msg = await race.channel.send("```🌾 경기 시작 준비 중...```")
+        await play_frames(track_msg, len(result.frames), lambda i: render_race_frame(horses, result.frames[i]),
+                          tick=TICK_SEC, min_interval=RACE_EDIT_INTERVAL)
+        order = result.order
+
+        medals=["🥇","🥈","🥉"]
+        result_lines=[f"{medals[r]} {horses[h]}" if r<3 else f"{r+1}등 {horses[h]}" for r,h in enumerate(order)]
+        pool = race.pool
+        winner_hidx = order[0]
+        payouts = pool.payouts(winner_hidx)
+        # 정산: 에스크로를 닫으면서 전원에게 한 번에 지급
+        race.closed = True
+        await asyncio.shield(races.ledger.release(race.hold_id, payouts))
+        settled = True
+        if pool and pool.totals[winner_hidx]:
+            top = sorted(payouts.items(), key=lambda kv: -kv[1])
+            lines = [f"<@{uid}> +{amount:,}" for uid, amount in top[:10]]
+            if len(top) > 10:
+                lines.append(f"…외 {len(top) - 10}명")
+            payout = (
+                f"🎉 우승 말: {horses[winner_hidx]} (배당 x{pool.odds(winner_hidx):.2f})\n"
+                f"💰 총 배팅액 {pool.total:,}포인트 · 하우스 {pool.edge:.0%}\n" + "\n".join(lines)
+            )
+        elif pool:
+            payout="💸 우승 말에 배팅한 유저가 없어 배팅 포인트를 모두 돌려드렸습니다."
+        else:
+            payout="😔 배팅 없이 진행되었습니다."
+        embed=Embed(title="🏁 경기 종료 결과",color=0x9B59B6)
+        embed.description="\n".join(result_lines)
+        embed.add_field(name="📢 배팅 결과",value=payout,inline=False)
+        embed.set_footer(text=f"경주 시드 {result.seed}")
+        await race.channel.send(embed=embed)
+    finally:
+        # 정산 전에 끝났으면(종료/오류) 배팅을 돌려줌 – 이미 돌려준 에스크로는 refund가 무시
+        await races.close(race, refund=not settled)
 
 @bot.command()
 async def 경마(ctx, action: str = None, *, args: str | None = None):
-    """!경마 입장 / 시작 / 종료"""
+    """!경마 입장 / 시작 / 현황 / 종료"""
+    race = races.get(ctx)
+
     # ─── 입장 ───
     if action == "입장":
-        if horse_race_state["is_running"]:
+        if race and race.is_running:
             return await ctx.send("🚫 이미 경주가 진행 중입니다.")
+        if race and race.pool:
+            return await ctx.send("🚫 배팅이 진행 중인 경주가 있습니다. `!경마 시작` 또는 `!경마 종료`를 먼저 해주세요.")
         if not args:
             return await ctx.send("❗ 형식: `!경마 입장 말1 말2 ...` (2~8마리)")
         horses = args.split()
         if not 2 <= len(horses) <= 8:
             return await ctx.send("❗ 말은 2~8마리만 등록 가능합니다.")
-        horse_race_state.update({
-            "horses": horses,
-            "positions": [0]*len(horses),
-            "bettors": {},
-            "pool": 0,
-            "is_running": False,
-            "msg": None
-        })
+        race = races.open(ctx, horses)
         embed = Embed(title="🏇 경마가 준비되었습니다!", color=0xF1C40F)
         embed.description = "말 번호와 금액으로 배팅하세요: `!배팅 <번호> <포인트>`\n\n" + "\n".join(
-            f"**{i+1}.** {name}" for i, name in enumerate(horse_race_state["horses"])
+            f"**{i+1}.** {name}" for i, name in enumerate(race.horses)
         )
         return await ctx.send(embed=embed)
 
     # ─── 시작 ───
     if action == "시작":
-        if not horse_race_state["horses"]:
+        if not race:
             return await ctx.send("❗ 먼저 `!경마 입장`으로 말을 등록해주세요.")
-        if horse_race_state["is_running"]:
+        if race.is_running:
             return await ctx.send("🚫 이미 경주가 시작되었습니다.")
 
-        horse_race_state["is_running"] = True
-        track_msg = await ctx.send("```🌾 경기 시작 준비 중...```")
-        horse_race_state["msg"] = track_msg
-
-        momentums = [random.uniform(0.8, 1.2) for _ in horse_race_state["horses"]]
-        finished, order, tick = set(), [], 0
-
-        while True:
-            await asyncio.sleep(TICK_SEC)
-            tick += 1
-            for idx in range(len(horse_race_state["positions"])):
-                if idx in finished:
-                    continue
-                condition = random.uniform(0.9, 1.1) * momentums[idx]
-                weights = [1*condition, 2.5, 3.5*(2-condition), 1.5]
-                step = random.choices([0,1,2,3], weights=weights)[0]
-                horse_race_state["positions"][idx] += step
-                if horse_race_state["positions"][idx] >= TRACK_LEN:
-                    finished.add(idx)
-                    order.append(idx)
-
-            if tick % REFRESH_EVERY == 0 or len(finished)==len(horse_race_state["horses"]):
-                lines=[]
-                for i,(name,pos) in enumerate(zip(horse_race_state["horses"],horse_race_state["positions"])):
-                    icon = HORSE_ICONS[i%len(HORSE_ICONS)]
-                    bar  = "."*min(pos,TRACK_LEN)+icon+"."*(TRACK_LEN-min(pos,TRACK_LEN))
-                    lines.append(f"{i+1}|{bar[:TRACK_LEN]}| {name}")
-                await track_msg.edit(content="```\n"+"\n".join(lines)+"\n```")
-            if len(finished)==len(horse_race_state["horses"]):
-                break
-
-        medals=["🥇","🥈","🥉"]
-        horses=horse_race_state["horses"]
-        result_lines=[f"{medals[r]} {horses[h]}" if r<3 else f"{r+1}등 {horses[h]}" for r,h in enumerate(order)]
-        pool   = horse_race_state["pool"]
-        bettors= horse_race_state["bettors"]
-        winner_hidx=order[0]
-        owner_id = next((uid for uid,(idx,amt) in bettors.items() if idx==winner_hidx), None)
-        if pool and owner_id:
-            data=read_data()
-            data["user_points"][owner_id]=data["user_points"].get(owner_id,0)+pool
-            write_data(data)
-            payout=f"🎉 우승 말: {horses[winner_hidx]}\n💰 총 배팅액 {pool}포인트를 <@{owner_id}>님이 가져갑니다!"
-        elif pool:
-            payout="💸 배팅이 있었지만 우승 말에 배팅한 유저가 없습니다."
-        else:
-            payout="😔 배팅 없이 진행되었습니다."
-        embed=Embed(title="🏁 경기 종료 결과",color=0x9B59B6)
-        embed.description="\n".join(result_lines)
-        embed.add_field(name="📢 배팅 결과",value=payout,inline=False)
-        await ctx.send(embed=embed)
-        horse_race_state.update({"horses":[],"positions":[],"bettors":{},"pool":0,"is_running":False,"msg":None})
+        race.is_running = True
+        race.task = asyncio.create_task(run_race(race), name=f"경마 {race.key}")
+        race.task.add_done_callback(log_task_failure)   # 전송/편집 실패도 환불 후 기록으로 남김
         return
 
+    # ─── 배당 현황 ───
+    if action == "현황":
+        if not race:
+            return await ctx.send("❗ 이 채널에서 진행 중인 경마가 없습니다.")
+        pool = race.pool
+        lines = []
+        for i, name in enumerate(race.horses):
+            odds = pool.odds(i)
+            lines.append(f"**{i+1}.** {name} — {pool.totals[i]:,}포인트 · " + (f"x{odds:.2f}" if odds else "배팅 없음"))
+        embed = Embed(title="📊 경마 배당 현황", description="\n".join(lines), color=0xF1C40F)
+        embed.set_footer(text=f"총 배팅 {pool.total:,}포인트 · 하우스 {pool.edge:.0%} · 배당은 배팅이 들어올 때마다 바뀝니다")
+        return await ctx.send(embed=embed)
+
     # ─── 종료 ───
     if action == "종료":
-        horse_race_state.update({"horses":[],"positions":[],"bettors":{},"pool":0,"is_running":False,"msg":None})
-        return await ctx.send("😕 경마가 강제 종료되었습니다.")
-
-    await ctx.send("❗ 사용법: `!경마 입장 ...`, `!경마 시작`, `!경마 종료`")
+        if not race:
+            return await ctx.send("❗ 이 채널에서 진행 중인 경마가 없습니다.")
+        uid = str(ctx.author.id)
+        if uid != race.host_id and uid not in ALLOWED_ADMIN_IDS:
+            return await ctx.send("⛔ 경마를 연 사람이나 관리자만 종료할 수 있습니다.")
+        if race.closed:
+            return await ctx.send("🏁 이미 정산 중인 경주입니다.")
+        await races.close(race, refund=True)
+        return await ctx.send("😕 경마가 강제 종료되었습니다. 배팅 포인트는 모두 돌려드렸어요.")
+
+    await ctx.send("❗ 사용법: `!경마 입장 ...`, `!경마 시작`, `!경마 현황`, `!경마 종료`")
 
 # ─── 배팅 명령어 ───
 @bot.command(name="배팅")
 async def 배팅(ctx, 번호: int=None, 금액: int=None):
-    if not horse_race_state["horses"]:
+    race = races.get(ctx)
+    if not race:
         return await ctx.send("❗ 먼저 말을 등록해주세요: `!경마 입장 ...`")
-    if horse_race_state["is_running"]:
+    if race.is_running:
         return await ctx.send("🚫 이미 경주가 시작되어 배팅할 수 없습니다.")
     if 번호 is None or 금액 is None:
         return await ctx.send("❗ 형식: `!배팅 <번호> <포인트>`")
-    if not 1<=번호<=len(horse_race_state["horses"]):
+    if not 1<=번호<=len(race.horses):
         return await ctx.send("❗ 유효한 말 번호를 입력해주세요.")
+    if 금액<=0:
+        return await ctx.send("❗ 배팅 금액은 1 이상이어야 합니다.")
     uid=str(ctx.author.id)
-    data=read_data()
-    if data["user_points"].get(uid,0)<금액:
+    horse=번호-1
+    # 풀에 먼저 올려 두고(시작 직전 배팅도 정산에 포함) 포인트를 에스크로에 묶음 – 실패하면 되돌림
+    race.pool.place(uid,horse,금액)
+    if await ledger.escrow(race.hold_id, {uid: 금액}) is not None:
+        race.pool.cancel(uid,horse,금액)
         return await ctx.send("😭 보유 포인트가 부족합니다.")
-    if uid in horse_race_state["bettors"]:
-        return await ctx.send("⚠️ 이미 배팅했습니다.")
-    # 포인트 차감 및 기록
-    data["user_points"][uid]-=금액
-    horse_race_state["bettors"][uid]=(번호-1,금액)
-    horse_race_state["pool"]+=금액
-    write_data(data)
-    await ctx.send(f"💸 {ctx.author.display_name}님이 {번호}번 말에 {금액}포인트 배팅!")
+    if race.closed:
+        # 묶는 사이 경주가 정산/종료됨 → 방금 묶은 판돈만 남은 에스크로를 돌려줌
+        await ledger.refund(race.hold_id)
+        return await ctx.send("🚫 경주가 이미 끝나 배팅이 취소되었습니다.")
+    race.touch()
+    await ctx.send(f"💸 {ctx.author.display_name}님이 {번호}번 말에 {금액}포인트 배팅! (현재 배당 x{race.pool.odds(horse):.2f})")
 
 # ───── 숫자게임 ─────
 @bot.command()
 async def 숫자게임(ctx):
-    target = random.randint(1, 10)
+    target = GAME_RNG["숫자게임"].randint(1, 10)
     await ctx.send("🎲 1부터 10 사이의 숫자를 맞혀보세요! (10초 안에 채팅으로 입력)")
 
-    def check(m):
-        return m.author == ctx.author and m.channel == ctx.channel
-
     try:
-        msg = await bot.wait_for('message', check=check, timeout=10.0)
+        with interactions.subscribe(ctx.channel.id, [ctx.author.id]) as sub:
+            msg = await sub.get(10.0)
         guess = int(msg.content)
 
         if guess == target:
-            data = read_data()
-            uid = str(ctx.author.id)
-            data["user_points"][uid] = data["user_points"].get(uid, 0) + 50
-            write_data(data)
+            await ledger.credit(str(ctx.author.id), 50)
             await ctx.send(f"🎉 정답입니다! 숫자는 {target}이었어요.\n💰 보상으로 50코인을 획득하셨습니다!")
         else:
             await ctx.send(f"❌ 틀렸어요! 정답은 {target}이었습니다.")
@@ -999,42 +2857,53 @@ async def 숫자게임(ctx):
 RESULT_TXT = ["무승부!", "패배...", "승리!"]  # (user - rival) % 3 => 0무 1패 2승
 
 # ──────────────────── !미니게임 도움말 ────────────────────
-@bot.command(name="미니게임", aliases=["미니게임도움말", "미니게임 도움말"])
-async def 미니게임도움말(ctx):
+def build_minigame_help_embed():
     embed = Embed(title="🎮 미니게임 도움말", color=discord.Color.teal())
-    embed.add_field(name="🏇 경마 게임", value="`!경마` → 1등 말에 배팅한 유저가 모든 포인트를 가져갑니다!", inline=False)
+    embed.add_field(name="🏇 경마 게임", value="`!경마 입장 말1 말2 ...` → `!배팅 번호 금액` (여러 번 가능) → 우승 말 배팅자끼리 배팅액 비율로 풀을 나눠 가집니다!", inline=False)
     embed.add_field(name="✊ 가위바위보 봇전", value="`!가위바위보 [가위|바위|보]` → 봇과 대결 (승리 시 포인트 획득)", inline=False)
     embed.add_field(name="⚔️ 가위바위보 대결", value="`!가위바위보대결 @상대` → 유저와 1:1 대결", inline=False)
     embed.add_field(name="⚡ 반응속도 배틀", value="`!반응속도 [배팅액]` → 가장 빠르게 입력한 유저가 포인트 독식!", inline=False)
     embed.add_field(name="🎲 주사위 게임", value="`!주사위` → 주사위 숫자 승부! 이기면 보상 획득", inline=False)
     embed.add_field(name="🎯 숫자 게임", value="`!숫자게임` → 1~10 사이 숫자를 맞춰서 100포인트 획득!", inline=False)
-    await ctx.send(embed=embed)
+    return embed
+
+renderer.register_static("미니게임도움말", build_minigame_help_embed)
+
+@bot.command(name="미니게임", aliases=["미니게임도움말", "미니게임 도움말"])
+async def 미니게임도움말(ctx):
+    await ctx.send(embed=renderer.static("미니게임도움말"))
 
 # ──────────────────── 미니게임 1) 가위바위보 봇전 (봇 vs 유저) ────────────────────
+def rps_return(result: int, stake: int) -> int:
+    """걸었던 판돈에서 돌려받는 금액 (승리 2배 / 무승부 원금 / 패배 0)"""
+    return stake * 2 if result == 2 else stake if result == 0 else 0
+
 @bot.command()
 async def 가위바위보(ctx, 선택: str | None = None, 포인트: int | None = 10):
     if 선택 not in CHOICES:
         return await ctx.send("❗ 형식: `!가위바위보 가위|바위|보 [포인트]`")
 
+    if not 포인트 or 포인트 <= 0:
+        return await ctx.send("❗ 포인트는 1 이상이어야 합니다.")
+
     uid = str(ctx.author.id)
-    data = read_data()
-    if data["user_points"].get(uid, 0) < 포인트:
+    # 판돈을 먼저 걸고 결과에 따라 돌려받음 (승리 2배 / 무승부 원금 / 패배 0)
+    def resolve():
+        bot_choice = GAME_RNG["가위바위보"].choice(list(CHOICES))
+        result = (CHOICES[선택] - CHOICES[bot_choice]) % 3
+        return (bot_choice, result), rps_return(result, 포인트)
+
+    settled = await ledger.wager(uid, 포인트, resolve)
+    if settled is None:
         return await ctx.send("😭 포인트가 부족합니다.")
-
-    bot_choice = random.choice(list(CHOICES.keys()))
-    result = (CHOICES[선택] - CHOICES[bot_choice]) % 3
-    if result == 2:
-        data["user_points"][uid] += 포인트
-    elif result == 1:
-        data["user_points"][uid] -= 포인트
-    write_data(data)
+    (bot_choice, result), balance = settled
 
     color = 0x2ecc71 if result == 2 else 0xe74c3c if result == 1 else 0x95a5a6
     embed = Embed(title="✊ 가위바위보 결과", color=color)
     embed.description = (
         f"당신: **{선택}**  vs  봇: **{bot_choice}**\n"
         f"결과: **{RESULT_TXT[result]}**\n"
-        f"현재 보유 포인트: {data['user_points'][uid]}"
+        f"현재 보유 포인트: {balance}"
     )
     await ctx.send(embed=embed)
 
@@ -1053,11 +2922,9 @@ async def 가위바위보대결(ctx, 상대: discord.Member = None):
         f"수락하려면 `!수락`을 입력해주세요. (30초 이내)"
     )
 
-    def 수락체크(m):
-        return m.author == 상대 and m.content.strip() == "!수락" and m.channel == ctx.channel
-
     try:
-        await bot.wait_for("message", timeout=30.0, check=수락체크)
+        with interactions.subscribe(ctx.channel.id, [상대.id], ["!수락"]) as sub:
+            await sub.get(30.0)
     except asyncio.TimeoutError:
         return await ctx.send("⌛ 상대가 수락하지 않아 대결이 취소되었습니다.")
 
@@ -1065,92 +2932,116 @@ async def 가위바위보대결(ctx, 상대: discord.Member = None):
 
     배팅액 = 10
 
-    def 배팅체크(m):
-        return m.author == ctx.author and m.content.startswith("!배팅금") and m.channel == ctx.channel
-
     try:
-        msg = await bot.wait_for("message", timeout=15.0, check=배팅체크)
+        with interactions.subscribe(ctx.channel.id, [ctx.author.id], ["!배팅금"], prefix=True) as sub:
+            msg = await sub.get(15.0)
         parts = msg.content.split()
-        if len(parts) == 2 and parts[1].isdigit():
+        if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) > 0:
             배팅액 = int(parts[1])
         else:
             return await ctx.send("❗ 올바른 형식으로 입력해주세요: `!배팅금 50`")
     except asyncio.TimeoutError:
         return await ctx.send("⌛ 배팅 입력 시간이 초과되어 대결이 취소됩니다.")
 
-    # 포인트 차감 처리
-    data = read_data()
-    for user in (ctx.author, 상대):
-        uid = str(user.id)
-        if data["user_points"].get(uid, 0) < 배팅액:
-            return await ctx.send(f"😭 {user.display_name}님의 포인트가 부족합니다.")
-        data["user_points"][uid] -= 배팅액
-    write_data(data)
+    # 포인트 차감 처리 (두 사람 판돈을 한 번에 에스크로로 묶음)
+    hold_id = f"rps:{ctx.message.id}"
+    short = await ledger.escrow(hold_id, {str(ctx.author.id): 배팅액, str(상대.id): 배팅액})
+    if short:
+        poor = ctx.author if short == str(ctx.author.id) else 상대
+        return await ctx.send(f"😭 {poor.display_name}님의 포인트가 부족합니다.")
+
+    async with ledger.settling(hold_id):   # 선택 대기 중 취소되거나 오류가 나도 판돈은 돌아감
+        await asyncio.sleep(3)
+        await ctx.send("✊✌️🖐️ 지금! `가위`, `바위`, `보` 중 하나를 입력하세요! (5초 이내)")
+
+        picks = {}
+
+        loop = asyncio.get_running_loop()
+        end_time = loop.time() + 5
+        with interactions.subscribe(ctx.channel.id, [ctx.author.id, 상대.id], CHOICES) as sub:
+            while len(picks) < 2 and loop.time() < end_time:
+                try:
+                    msg = await sub.get(end_time - loop.time())
+                    picks[msg.author.id] = msg.content.strip()
+                except asyncio.TimeoutError:
+                    break
 
-    await asyncio.sleep(3)
-    await ctx.send("✊✌️🖐️ 지금! `가위`, `바위`, `보` 중 하나를 입력하세요! (5초 이내)")
+        a_pick = picks.get(ctx.author.id)
+        b_pick = picks.get(상대.id)
 
-    picks = {}
+        if not a_pick or not b_pick:
+            forfeiter = 상대 if not b_pick else ctx.author
+            winner = ctx.author if forfeiter == 상대 else 상대
+            await ledger.release(hold_id, {str(winner.id): 배팅액 * 2})
+            return await ctx.send(
+                f"🏃‍♀️ {forfeiter.display_name}님이 입력하지 않아 자동 패배!\n"
+                f"{winner.display_name}님이 배팅액 {배팅액 * 2}포인트를 전부 가져갑니다!"
+            )
 
-    def 선택체크(m):
-        return m.author in (ctx.author, 상대) and m.content.strip() in CHOICES and m.channel == ctx.channel
+        diff = (CHOICES[a_pick] - CHOICES[b_pick]) % 3
+        winner = None
+        if diff == 0:
+            result_msg = "무승부! 포인트 반환"
+            await ledger.refund(hold_id)
+        elif diff == 1:
+            winner = ctx.author
+            result_msg = f"🏆 {ctx.author.display_name}님 승리! 배팅액 {배팅액 * 2}포인트를 전부 가져갑니다!"
+        else:
+            winner = 상대
+            result_msg = f"🏆 {상대.display_name}님 승리! 배팅액 {배팅액 * 2}포인트를 전부 가져갑니다!"
 
-    end_time = asyncio.get_event_loop().time() + 5
-    while len(picks) < 2 and asyncio.get_event_loop().time() < end_time:
-        try:
-            msg = await bot.wait_for("message", timeout=end_time - asyncio.get_event_loop().time(), check=선택체크)
-            picks[msg.author.id] = msg.content.strip()
-        except asyncio.TimeoutError:
-            break
+        if winner:
+            await ledger.release(hold_id, {str(winner.id): 배팅액 * 2})
 
-    a_pick = picks.get(ctx.author.id)
-    b_pick = picks.get(상대.id)
-
-    if not a_pick or not b_pick:
-        forfeiter = 상대 if not b_pick else ctx.author
-        winner = ctx.author if forfeiter == 상대 else 상대
-        uid = str(winner.id)
-        data = read_data()
-        data["user_points"][uid] = data["user_points"].get(uid, 0) + 배팅액 * 2
-        write_data(data)
-        return await ctx.send(
-            f"🏃‍♀️ {forfeiter.display_name}님이 입력하지 않아 자동 패배!\n"
-            f"{winner.display_name}님이 배팅액 {배팅액 * 2}포인트를 전부 가져갑니다!"
+        embed = Embed(title="✂️ 가위바위보 대결 결과", color=discord.Color.blue())
+        embed.description = (
+            f"{ctx.author.display_name}: **{a_pick}**  vs  {상대.display_name}: **{b_pick}**\n\n"
+            f"{result_msg}"
         )
+        await ctx.send(embed=embed)
 
-    diff = (CHOICES[a_pick] - CHOICES[b_pick]) % 3
-    winner = None
-    if diff == 0:
-        result_msg = "무승부! 포인트 반환"
-        data = read_data()
-        for user in (ctx.author, 상대):
-            uid = str(user.id)
-            data["user_points"][uid] = data["user_points"].get(uid, 0) + 배팅액
-        write_data(data)
-    elif diff == 1:
-        winner = ctx.author
-        result_msg = f"🏆 {ctx.author.display_name}님 승리! 배팅액 {배팅액 * 2}포인트를 전부 가져갑니다!"
-    else:
-        winner = 상대
-        result_msg = f"🏆 {상대.display_name}님 승리! 배팅액 {배팅액 * 2}포인트를 전부 가져갑니다!"
 
-    if winner:
-        uid = str(winner.id)
-        data = read_data()
-        data["user_points"][uid] = data["user_points"].get(uid, 0) + 배팅액 * 2
-        write_data(data)
+# ──────────────────── 미니게임 3) 반응속도 배틀 (1:N 전용) ────────────────────
+REACTION_WINDOW = 5.0   # '지금!' 이후 인정하는 입력 시간 (디스코드 타임스탬프 기준, 초)
+REACTION_GRACE = 2.0    # 창이 끝난 뒤 늦게 도착하는 메시지를 더 기다리는 시간 (초)
 
-    embed = Embed(title="✂️ 가위바위보 대결 결과", color=discord.Color.blue())
-    embed.description = (
-        f"{ctx.author.display_name}: **{a_pick}**  vs  {상대.display_name}: **{b_pick}**\n\n"
-        f"{result_msg}"
-    )
-    await ctx.send(embed=embed)
+def snowflake_delta(earlier: int, later: int) -> float:
+    """두 스노우플레이크 ID의 생성 시각 차이 (초, ms 정밀도). 봇이 메시지를 처리한 시점과 무관합니다."""
+    return ((later >> 22) - (earlier >> 22)) / 1000
 
+class LoopLagProbe:
+    """이벤트 루프 지연 측정: interval마다 잠들었다 깨어난 시각이 얼마나 늦었는지 기록합니다."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            before = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - before - self.interval))
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+    def summary(self) -> str:
+        if not self.samples:
+            return "측정 없음"
+        avg = sum(self.samples) / len(self.samples) * 1000
+        return f"평균 {avg:.1f}ms / 최대 {max(self.samples) * 1000:.1f}ms"
 
-# ──────────────────── 미니게임 3) 반응속도 배틀 (1:N 전용) ────────────────────
 @bot.command(name="반응속도")
 async def 반응속도(ctx, 베팅: int = 10):
+    if 베팅 <= 0:
+        return await ctx.send("❌ 배팅 금액은 1 이상이어야 합니다.")
+
     # ───── ① 안내 메시지 ─────
     await ctx.send(
         f"⚡ **반응속도 배틀** 시작!\n"
@@ -1162,134 +3053,159 @@ async def 반응속도(ctx, 베팅: int = 10):
     # ───── ② 참가자 초기화 (방장은 자동 참가) ─────
     participants: dict[int, str] = {ctx.author.id: ctx.author.display_name}
 
-    # 참가‧시작 메시지 판별 함수
-    def wait_check(m: discord.Message) -> bool:
-        return (
-            m.channel == ctx.channel
-            and not m.author.bot
-            and m.content.strip() in ("!참가", "!시작")
-        )
-
     # ───── ③ 30초 또는 방장 !시작 입력까지 대기 ─────
-    end_time = asyncio.get_event_loop().time() + 30
-    while asyncio.get_event_loop().time() < end_time:
-        try:
-            msg: discord.Message = await bot.wait_for(
-                "message",
-                timeout=end_time - asyncio.get_event_loop().time(),
-                check=wait_check,
-            )
-
-            content = msg.content.strip()
-
-            # ③-A 참가 처리
-            if content == "!참가":
-                if msg.author.id not in participants:
-                    participants[msg.author.id] = msg.author.display_name
-                    await ctx.send(f"✅ **{msg.author.display_name}** 님 참가 완료! (현재 {len(participants)}명)")
-
-            # ③-B 즉시 시작 처리 (방장만 허용)
-            elif content == "!시작" and msg.author == ctx.author:
-                if len(participants) < 2:
-                    await ctx.send("❗ 최소 2명이 있어야 시작할 수 있습니다!")
-                else:
-                    await ctx.send("⏩ 방장이 시작을 눌렀습니다. 바로 게임을 시작합니다!")
-                    break
-
-        except asyncio.TimeoutError:
-            break  # 30초 만료
+    loop = asyncio.get_running_loop()
+    end_time = loop.time() + 30
+    with interactions.subscribe(ctx.channel.id, None, ("!참가", "!시작")) as join_sub:
+        while loop.time() < end_time:
+            try:
+                msg: discord.Message = await join_sub.get(end_time - loop.time())
+
+                content = msg.content.strip()
+
+                # ③-A 참가 처리
+                if content == "!참가":
+                    if msg.author.id not in participants:
+                        participants[msg.author.id] = msg.author.display_name
+                        await ctx.send(f"✅ **{msg.author.display_name}** 님 참가 완료! (현재 {len(participants)}명)")
+
+                # ③-B 즉시 시작 처리 (방장만 허용)
+                elif content == "!시작" and msg.author == ctx.author:
+                    if len(participants) < 2:
+                        await ctx.send("❗ 최소 2명이 있어야 시작할 수 있습니다!")
+                    else:
+                        await ctx.send("⏩ 방장이 시작을 눌렀습니다. 바로 게임을 시작합니다!")
+                        break
+
+            except asyncio.TimeoutError:
+                break  # 30초 만료
 
     # ───── ④ 참가 인원 확인 ─────
     if len(participants) < 2:
         return await ctx.send("❗ 2명 이상 참가해야 합니다. 게임이 취소되었습니다.")
 
-    # ───── ⑤ 베팅 포인트 차감 ─────
-    data = read_data()
-    for uid in participants:
-        if data["user_points"].get(str(uid), 0) < 베팅:
-            return await ctx.send(f"😭 {participants[uid]}님의 포인트가 부족합니다!")
-        data["user_points"][str(uid)] -= 베팅
-    write_data(data)
-
-    # ───── ⑥ 본게임: '솔라리스' 입력 속도 측정 ─────
-    await ctx.send("준비... 키보드에 손을 올려 주세요!")
-    await asyncio.sleep(random.uniform(2, 5))  # 랜덤 대기
-    await ctx.send("✨ **지금!** `솔라리스` 를 가장 빠르게 입력!")
-
-    start = time.perf_counter()
-    times: dict[int, float] = {}
-
-    def reaction_check(m: discord.Message) -> bool:
-        return (
-            m.channel == ctx.channel
-            and m.content.strip() == "솔라리스"
-            and m.author.id in participants
+    # ───── ⑤ 베팅 포인트 차감 (전원 한 번에, 한 명이라도 부족하면 아무도 차감 안 함) ─────
+    hold_id = f"reaction:{ctx.message.id}"
+    short = await ledger.escrow(hold_id, {str(uid): 베팅 for uid in participants})
+    if short:
+        return await ctx.send(f"😭 {participants[int(short)]}님의 포인트가 부족합니다!")
+
+    async with ledger.settling(hold_id):   # 측정 중 취소되거나 오류가 나도 판돈은 돌아감
+        # ───── ⑥ 본게임: '솔라리스' 입력 속도 측정 ─────
+        # 시간은 봇이 메시지를 처리한 시점이 아니라 디스코드가 붙인 타임스탬프(스노우플레이크)로 잽니다.
+        # '지금!' 전송 응답을 기다리는 사이에 온 입력도 놓치지 않도록 먼저 구독하고, '지금!'보다 앞선 메시지는 버립니다.
+        await ctx.send("준비... 키보드에 손을 올려 주세요!")
+        await asyncio.sleep(random.uniform(2, 5))  # 랜덤 대기
+
+        times: dict[int, float] = {}
+        loop = asyncio.get_running_loop()
+        with LoopLagProbe() as lag, interactions.subscribe(ctx.channel.id, participants, ["솔라리스"]) as sub:
+            go = await ctx.send("✨ **지금!** `솔라리스` 를 가장 빠르게 입력!")
+            end_time = loop.time() + REACTION_WINDOW + REACTION_GRACE
+            while len(times) < len(participants):
+                try:
+                    msg: discord.Message = await sub.get(end_time - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                elapsed = snowflake_delta(go.id, msg.id)
+                if msg.id <= go.id or elapsed > REACTION_WINDOW or msg.author.id in times:
+                    continue  # '지금!' 이전 입력, 시간 초과, 두 번째 입력은 무시
+                times[msg.author.id] = elapsed
+
+        # ───── ⑦ 결과 집계 ─────
+        if not times:
+            # 아무도 입력 안 하면 환불
+            await ledger.refund(hold_id)
+            return await ctx.send("⌛ 아무도 입력하지 않아 게임이 무효가 되었습니다. 포인트를 환불했습니다.")
+
+        winner_id = min(times, key=times.get)               # 가장 짧은 시간
+        pot = 베팅 * len(participants)                      # 총 상금
+        await ledger.release(hold_id, {str(winner_id): pot})  # 상금 지급
+
+        # 랭킹 문자열 생성
+        ranking = sorted(times.items(), key=lambda x: x[1])
+        result_txt = "\n".join([f"{i+1}등 : <@{uid}>  {t:.3f}s" for i, (uid, t) in enumerate(ranking)])
+
+        # ───── ⑧ 결과 메시지 Embed ─────
+        embed = Embed(title="⚡ 반응속도 배틀 결과", color=discord.Color.gold())
+        embed.description = (
+            f"🏆 **1등 <@{winner_id}>**, 총 상금 **{pot}포인트** 획득!\n\n"
+            f"{result_txt}"
         )
+        embed.set_footer(text=f"디스코드 타임스탬프 기준 측정 · 봇 루프 지연 {lag.summary()}")
+        await ctx.send(embed=embed)
 
-    while len(times) < len(participants):
-        try:
-            msg: discord.Message = await bot.wait_for("message", timeout=5.0, check=reaction_check)
-            if msg.author.id not in times:  # 첫 반응만 기록
-                times[msg.author.id] = round(time.perf_counter() - start, 3)
-        except asyncio.TimeoutError:
-            break
+# ───── 주사위 게임 ─────
+DICE_STAKE = 10
 
-    # ───── ⑦ 결과 집계 ─────
-    if not times:
-        # 아무도 입력 안 하면 환불
-        for uid in participants:
-            data["user_points"][str(uid)] += 베팅
-        write_data(data)
-        return await ctx.send("⌛ 아무도 입력하지 않아 게임이 무효가 되었습니다. 포인트를 환불했습니다.")
-
-    winner_id = min(times, key=times.get)               # 가장 짧은 시간
-    pot = 베팅 * len(participants)                      # 총 상금
-    data["user_points"][str(winner_id)] += pot          # 상금 지급
-    write_data(data)
-
-    # 랭킹 문자열 생성
-    ranking = sorted(times.items(), key=lambda x: x[1])
-    result_txt = "\n".join([f"{i+1}등 : <@{uid}>  {t}s" for i, (uid, t) in enumerate(ranking)])
-
-    # ───── ⑧ 결과 메시지 Embed ─────
-    embed = Embed(title="⚡ 반응속도 배틀 결과", color=discord.Color.gold())
-    embed.description = (
-        f"🏆 **1등 <@{winner_id}>**, 총 상금 **{pot}포인트** 획득!\n\n"
-        f"{result_txt}"
-    )
-    await ctx.send(embed=embed)
+def roll_dice(rng: random.Random) -> tuple[int, int]:
+    return rng.randint(1, 6), rng.randint(1, 6)
+
+def dice_return(player_roll: int, bot_roll: int) -> int:
+    """판돈 DICE_STAKE에서 돌려받는 금액 (승리 4배 / 무승부 원금 / 패배 0)"""
+    if player_roll > bot_roll:
+        return DICE_STAKE * 4
+    return DICE_STAKE if player_roll == bot_roll else 0
 
-# ───── 주사위 게임 ─────
 @bot.command(name="주사위")
 async def 주사위(ctx):
     uid = str(ctx.author.id)
-    data = read_data()
 
-    if data["user_points"].get(uid, 0) < 10:
-        return await ctx.send("❗ 최소 10포인트가 필요합니다.")
+    # 10포인트를 걸고 결과에 따라 돌려받음 (승리 +30 / 무승부 0 / 패배 -10)
+    def resolve():
+        rolls = roll_dice(GAME_RNG["주사위"])
+        return rolls, dice_return(*rolls)
 
-    player_roll = random.randint(1, 6)
-    bot_roll = random.randint(1, 6)
+    settled = await ledger.wager(uid, DICE_STAKE, resolve)
+    if settled is None:
+        return await ctx.send("❗ 최소 10포인트가 필요합니다.")
+    (player_roll, bot_roll), balance = settled
 
     result_msg = ""
     if player_roll > bot_roll:
-        data["user_points"][uid] += 30
         result_msg = f"🎉 주사위 승리! +30포인트\n"
     elif player_roll < bot_roll:
-        data["user_points"][uid] -= 10
         result_msg = f"😢 주사위 패배... -10포인트\n"
     else:
         result_msg = "🤝 주사위 무승부! 포인트 변동 없습니다~"
 
-    write_data(data)
-
     embed = Embed(title="🎲 주사위 대결", color=discord.Color.green())
     embed.description = (
         f"당신 🎲: {player_roll}  vs  봇 🎲: {bot_roll}\n\n"
-        f"{result_msg}현재 포인트: {data['user_points'][uid]}"
+        f"{result_msg}현재 포인트: {balance}"
+    )
+    await ctx.send(embed=embed)
+
+# ───── 저장소 상태 (관리자) ─────
+@bot.command()
+async def 저장상태(ctx):
+    if str(ctx.author.id) not in ALLOWED_ADMIN_IDS:
+        return await ctx.send("⛔ 이 명령은 관리자만 사용할 수 있습니다.")
+
+    st = store.stats()
+    rc = renderer.stats()
+    holds, held = ledger.held_total()
+    embed = Embed(title="💾 저장소 상태", color=0x7F8C8D)
+    embed.description = (
+        f"• 백엔드 : {st['backend']}\n"
+        f"• 스냅샷 대기 키 : {st['dirty']}개\n"
+        f"• 저널 : 대기 {st['journal_pending']}건 / 커밋 {st['commits']:,}회 (최근 {st['commit_ms']:.1f}ms)\n"
+        f"• 스냅샷 : {st['flushes']:,}회\n"
+        f"• 스냅샷 지연 : 최근 {st['last_ms']:.1f}ms / 평균 {st['avg_ms']:.1f}ms / 최대 {st['max_ms']:.1f}ms\n"
+        f"• 렌더 캐시 : 적중 {rc['hits']:,} / 미스 {rc['misses']:,} (적중률 {rc['hit_rate']:.1f}%, {rc['entries']}개 보관)\n"
+        f"• 게임 입력 대기 : {interactions.active()}개\n"
+        f"• 에스크로 : {holds}건 / {held:,}포인트"
     )
     await ctx.send(embed=embed)
 
 # ───── 봇 실행 ─────
-print("🤖 디스코드 봇 메카살인기 실행 준비 완료!")
-bot.run(TOKEN)
\ No newline at end of file
+if __name__ == "__main__":
+    if not TOKEN:
+        raise ValueError("❗ BOT_TOKEN 환경변수가 설정되지 않았습니다.")
+    store.load()
+    print("🤖 디스코드 봇 메카살인기 실행 준비 완료!")
+    try:
+        bot.run(TOKEN)
+    finally:
+        voice_tracker.drain()
+        store.close()
@@ -0,0 +1,124 @@
+"""게임 배당 몬테카를로 시뮬레이션 (디스코드 연결 없이 bot.py의 배당 함수를 그대로 사용)
+
+    python simulate_games.py                 # 게임당 1,000,000판
+    python simulate_games.py -n 200000 --seed 7 --games 도박 슬롯
+
+RTP = 돌려받은 총액 / 건 총액, 하우스 엣지 = 1 - RTP.
+분산/표준편차는 한 판의 순손익(돌려받은 금액 - 판돈) 기준입니다.
+출석/구걸은 판돈이 없는 지급이므로 1회 평균 지급액을 보여 줍니다.
+"""
+import argparse
+import math
+import os
+import time
+
+os.environ.setdefault("BOT_TOKEN", "simulate")
+import bot  # noqa: E402
+
+class Tally:
+    """판돈/지급 합계와 순손익 분산 (합, 제곱합으로 누적)"""
+
+    def __init__(self):
+        self.rounds = 0
+        self.staked = 0
+        self.returned = 0
+        self.net_sum = 0
+        self.net_sq = 0
+        self.wins = 0
+        self.jackpots = 0
+
+    def add(self, stake, returned, jackpot=False):
+        net = returned - stake
+        self.rounds += 1
+        self.staked += stake
+        self.returned += returned
+        self.net_sum += net
+        self.net_sq += net * net
+        self.wins += returned > stake
+        self.jackpots += jackpot
+
+    def report(self, name, elapsed):
+        mean = self.net_sum / self.rounds
+        var = self.net_sq / self.rounds - mean * mean
+        line = f"{name:<6} {self.rounds:>10,}판 {elapsed:6.1f}s  "
+        if self.staked:
+            rtp = self.returned / self.staked
+            line += f"RTP {rtp:7.2%}  엣지 {1 - rtp:7.2%}  "
+        else:
+            line += f"평균 지급 {self.returned / self.rounds:8.2f}  "
+        line += f"순손익 평균 {mean:9.3f}  분산 {var:12.2f}  표준편차 {math.sqrt(var):9.2f}  이득 {self.wins / self.rounds:6.2%}"
+        if self.jackpots:
+            line += f"  잭팟 {self.jackpots:,}회 (1/{self.rounds / self.jackpots:,.0f})"
+        return line
+
+def sim_checkin(rng, n, t):
+    for _ in range(n):
+        t.add(0, bot.CHECKIN_REWARD + bot.roll_checkin_bonus(rng))
+
+def sim_beg(rng, n, t):
+    for _ in range(n):
+        t.add(0, bot.roll_beg(rng))
+
+def sim_gamble(rng, n, t, stake=100):
+    for _ in range(n):
+        t.add(stake, stake * bot.roll_gamble(rng))
+
+def sim_slot(rng, n, t):
+    pool = 0   # slot_bets – 잭팟이 터지면 0으로
+    for _ in range(n):
+        pool += bot.BET_AMOUNT
+        reward = bot.slot_payout(bot.spin_slot(rng), bot.BASE_JACKPOT + pool)
+        if reward:
+            pool = 0
+        t.add(bot.BET_AMOUNT, reward, jackpot=bool(reward))
+
+def sim_rps(rng, n, t, stake=10):
+    choices = list(bot.CHOICES)
+    for _ in range(n):
+        user = rng.choice(choices)
+        result = (bot.CHOICES[user] - bot.CHOICES[rng.choice(choices)]) % 3
+        t.add(stake, bot.rps_return(result, stake))
+
+def sim_dice(rng, n, t):
+    for _ in range(n):
+        t.add(bot.DICE_STAKE, bot.dice_return(*bot.roll_dice(rng)))
+
+def sim_race(rng, n, t, horses=5, bettors=6, stake=100):
+    """말 horses마리, 배팅자 bettors명이 무작위 말에 stake씩 거는 경주 (배팅자 한 명 = 한 판)"""
+    for _ in range(n):
+        pool = bot.ParimutuelPool(horses)
+        picks = [(str(b), rng.randrange(horses)) for b in range(bettors)]
+        for uid, horse in picks:
+            pool.place(uid, horse, stake)
+        winner = bot.simulate_race(horses, rng.getrandbits(32)).order[0]
+        payouts = pool.payouts(winner)
+        for uid, _ in picks:
+            t.add(stake, payouts.get(uid, 0))
+
+GAMES = {
+    "출석": (sim_checkin, 1),
+    "구걸": (sim_beg, 1),
+    "도박": (sim_gamble, 1),
+    "슬롯": (sim_slot, 1),
+    "가위바위보": (sim_rps, 1),
+    "주사위": (sim_dice, 1),
+    "경마": (sim_race, 20),   # 경주 한 번이 훨씬 무거우므로 판 수를 1/20로
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--rounds", type=int, default=1_000_000, help="게임당 판 수")
+    parser.add_argument("--seed", default="sim", help="난수 시드 (게임별로 make_game_rng에 전달)")
+    parser.add_argument("--games", nargs="*", default=list(GAMES), choices=list(GAMES))
+    args = parser.parse_args()
+
+    for name in args.games:
+        sim, divisor = GAMES[name]
+        rng = bot.make_game_rng(name, args.seed)
+        tally = Tally()
+        started = time.perf_counter()
+        sim(rng, max(1, args.rounds // divisor), tally)
+        print(tally.report(name, time.perf_counter() - started))
+
+if __name__ == "__main__":
+    main()
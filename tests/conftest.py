@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# bot.py는 저장소 루트의 단일 모듈 – 토큰 없이도 import되도록 (실행은 __main__에서만)
+os.environ.setdefault("BOT_TOKEN", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    """임시 디렉터리의 JSON 백엔드를 쓰는 DataStore"""
+    store = bot.DataStore(bot.JsonBackend(str(tmp_path / "data.json"), str(tmp_path / "data.journal")))
+    store.load()
+    yield store
+    store.close()
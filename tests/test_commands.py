@@ -0,0 +1,57 @@
+import asyncio
+import types
+
+import bot
+
+
+def test_admin_commands_need_exact_name():
+    trie = bot.CommandTrie()
+    trie.build(bot.bot)
+    for prefix in ("초", "초기", "저", "저장", "지"):
+        assert trie.resolve(prefix) is None
+    assert trie.resolve("초기화") == "초기화"
+    assert trie.resolve("ㅊㄱㅎ") is None
+    assert trie.resolve("ㅈㅈㅅㅌ") is None
+    assert trie.resolve("ㅈㄱ") == "지급"
+    assert trie.resolve("슬") == "슬롯"
+
+
+def test_plain_chat_skips_command_parsing(monkeypatch):
+    calls = []
+
+    async def get_context(message):
+        calls.append(message)
+
+    monkeypatch.setattr(bot.bot, "get_context", get_context)
+    message = types.SimpleNamespace(
+        content="안녕하세요", author=types.SimpleNamespace(bot=False, id=1), channel=types.SimpleNamespace(id=1),
+    )
+    asyncio.run(bot.on_message(message))
+    assert calls == []
+
+
+def _trie(keys):
+    trie = bot.CommandTrie()
+    for key, target in keys.items():
+        trie.insert(key, target)
+    return trie
+
+
+def test_trie_prefers_exact_keys_then_unique_prefixes():
+    trie = _trie({"출석": "출석", "출석랭킹": "출석랭킹", "슬롯": "슬롯", "ㅅㄹ": "슬롯", "보내기": "보내기"})
+    assert trie.resolve("출석") == "출석"           # 다른 키의 접두사여도 정확히 일치하면 우선
+    assert trie.resolve("출석랭") == "출석랭킹"
+    assert trie.resolve("출") is None               # 두 명령어의 공통 접두사
+    assert trie.resolve("ㅅ") == "슬롯"             # 별칭도 같은 명령어로만 이어지면 접두사로 찾음
+    assert trie.resolve("보") == "보내기"
+    assert trie.resolve("없는명령") is None
+    assert trie.resolve("") is None
+
+
+def test_trie_exact_only_targets_are_not_prefix_reachable():
+    trie = _trie({"초기화": "초기화", "초대": "초대", "지급": "지급", "ㅈㄱ": "지급"})
+    assert trie.resolve("초") == "초대"             # 초기화는 접두사 후보에서 빠짐
+    assert trie.resolve("초기") is None
+    assert trie.resolve("초기화") == "초기화"
+    assert trie.resolve("ㅈ") is None
+    assert trie.resolve("ㅈㄱ") == "지급"
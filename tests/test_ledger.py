@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def ledger(store):
+    return bot.Ledger(store)
+
+
+def test_escrow_rejects_non_positive_stakes(store, ledger):
+    async def run():
+        store.set("user_points", "1", 50)
+        with pytest.raises(ValueError):
+            await ledger.escrow("x", {"1": -100, "2": -100})
+        with pytest.raises(ValueError):
+            await ledger.escrow("x", {"1": 0})
+        await store.sync()
+
+    asyncio.run(run())
+    assert store.get("user_points", "1") == 50
+    assert store.get("user_points", "2") == 0
+    assert ledger.held_total() == (0, 0)
+
+
+def test_wager_settles_stake_payout_and_stats_together(store, ledger):
+    async def run():
+        store.set("user_points", "1", 100)
+        await store.sync()
+        commits = store.commit_count
+        settled = await ledger.wager("1", 30, lambda: ("win", 90),
+                                     stats=lambda outcome, payout: {"gamble_points": payout})
+        assert settled == ("win", 160)
+        assert store.commit_count == commits + 1
+        assert await ledger.wager("1", 500, lambda: ("win", 0)) is None
+
+    asyncio.run(run())
+    assert store.get("gamble_points", "1") == 90
@@ -0,0 +1,30 @@
+import bot
+
+
+def old_calculate_level(total_xp):
+    """기준 커밋(c5b78dd)의 반복문 구현"""
+    level = 1
+    while total_xp >= bot.xp_for_next(level):
+        total_xp -= bot.xp_for_next(level)
+        level += 1
+    remaining = bot.xp_for_next(level) - total_xp
+    return level, remaining
+
+
+def test_level_info_matches_the_old_loop():
+    # 레벨 경계 바로 앞/위/뒤와 큰 값까지
+    boundaries = [bot.xp_to_reach(level) + delta for level in range(1, 300) for delta in (-1, 0, 1)]
+    for xp in [0, 1, 99, 100, 119, 120, *boundaries, 10 ** 6, 10 ** 7 + 3]:
+        if xp < 0:
+            continue
+        level, remaining = old_calculate_level(xp)
+        info = bot.level_info(xp)
+        assert (info.level, info.remaining) == (level, remaining), xp
+        assert info.current + info.remaining == info.needed == bot.xp_for_next(level)
+        assert info.tier == bot.get_rank(level)
+        assert bot.calculate_level(xp) == (level, remaining)
+
+
+def test_level_info_many_matches_level_info():
+    xps = list(range(0, 50_000, 137))
+    assert bot.level_info_many(xps) == [bot.level_info(xp) for xp in xps]
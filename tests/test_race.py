@@ -0,0 +1,60 @@
+import pytest
+
+import bot
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (None, 0.05),
+    ("0.1", 0.1),
+    ("0", 0.0),
+    ("abc", 0.05),
+    ("1", 0.99),
+    ("2.5", 0.99),
+    ("-0.2", 0.0),
+    ("nan", 0.05),
+])
+def test_house_edge_is_parsed_into_range(raw, expected):
+    assert bot.parse_house_edge(raw) == expected
+
+
+def test_parimutuel_splits_net_pool_by_winning_stake():
+    pool = bot.ParimutuelPool(3, edge=0.1)
+    pool.place("a", 0, 100)
+    pool.place("b", 0, 50)
+    pool.place("c", 1, 150)
+    pool.place("a", 2, 33)
+    assert pool.total == 333 and pool.totals == [150, 150, 33]
+    assert pool.odds(0) == pytest.approx(333 * 0.9 / 150)
+
+    payouts = pool.payouts(0)
+    # 순 풀 299.7 → 100:50 비율, 1포인트 미만은 버림
+    assert payouts == {"a": 199, "b": 99}
+    assert sum(payouts.values()) <= pool.net
+
+
+def test_parimutuel_rounds_down_and_never_pays_more_than_the_pool():
+    pool = bot.ParimutuelPool(2, edge=0.05)
+    for i in range(7):
+        pool.place(str(i), 0, 3)
+    pool.place("loser", 1, 10)
+    payouts = pool.payouts(0)
+    assert set(payouts.values()) == {int(3 * pool.net / 21)}
+    assert sum(payouts.values()) <= pool.net
+
+
+def test_parimutuel_refunds_everyone_when_nobody_backed_the_winner():
+    pool = bot.ParimutuelPool(3)
+    pool.place("a", 0, 10)
+    pool.place("a", 1, 5)
+    pool.place("b", 1, 20)
+    assert pool.odds(2) is None
+    assert pool.payouts(2) == {"a": 15, "b": 20}
+
+
+def test_parimutuel_cancel_undoes_place():
+    pool = bot.ParimutuelPool(2)
+    pool.place("a", 0, 10)
+    pool.place("a", 0, 5)
+    pool.cancel("a", 0, 5)
+    pool.cancel("a", 0, 10)
+    assert not pool and pool.totals == [0, 0] and pool.stakes == {}
@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import bot
+
+
+def _use_tmp_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(bot, "DATA_FILE", str(tmp_path / "data.json"))
+    monkeypatch.setattr(bot, "JOURNAL_FILE", str(tmp_path / "data.journal"))
+    monkeypatch.setattr(bot, "TALENT_STORE_FILE", str(tmp_path / "talent_store.json"))
+
+
+def test_sqlite_migrates_legacy_list_logs(monkeypatch, tmp_path):
+    _use_tmp_files(monkeypatch, tmp_path)
+    legacy = {
+        "user_points": {"1": 500, "2": 30},
+        "checkin_log": {"1": ["2024-05-01", "2024-05-02", "2024-05-04"], "2": ["2024-05-03"]},
+        "beg_log": {"1": ["2024-05-04", "2024-05-04", "2024-05-03"]},
+    }
+    (tmp_path / "data.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    backend = bot.SqliteBackend(str(tmp_path / "data.db"))
+    try:
+        data, _, migrated = backend.load()
+    finally:
+        backend.close()
+
+    assert migrated
+    assert data["user_points"] == {"1": 500, "2": 30}
+    # 구걸 기록이 없는 유저의 출석도 지워지지 않아야 함
+    assert data["checkin_log"]["2"]["total"] == 1
+    assert data["checkin_log"]["2"]["last"] == "2024-05-03"
+    rec = data["checkin_log"]["1"]
+    assert (rec["first"], rec["last"], rec["total"]) == ("2024-05-01", "2024-05-04", 3)
+    assert data["beg_log"]["1"] == {"2024-05-04": 2, "2024-05-03": 1}
+
+    # 다시 열어도 (재이전 없이) 같은 값
+    backend = bot.SqliteBackend(str(tmp_path / "data.db"))
+    try:
+        again, _, migrated = backend.load()
+    finally:
+        backend.close()
+    assert not migrated
+    assert again["checkin_log"] == data["checkin_log"]
+    assert again["beg_log"] == data["beg_log"]
+
+
+def test_json_journal_truncates_torn_tail(tmp_path):
+    data_path, journal_path = str(tmp_path / "data.json"), str(tmp_path / "data.journal")
+    with open(journal_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"o": "add", "k": "user_points", "u": "1", "v": 100, "s": 1}) + "\n")
+        f.write('{"o": "add", "k": "user_po')   # 기록 도중 끊긴 줄
+
+    backend = bot.JsonBackend(data_path, journal_path)
+    data, seq, _ = backend.load()
+    assert data["user_points"] == {"1": 100} and seq == 1
+    backend.commit([{"o": "add", "k": "user_points", "u": "1", "v": 50, "s": 2}])
+    backend.close()
+
+    data, seq, _ = bot.JsonBackend(data_path, journal_path).load()
+    assert data["user_points"] == {"1": 150} and seq == 2
+
+
+def test_reset_keeps_exempt_sections(store):
+    store.set("user_points", "1", 100)
+    store.set("talent_store", "1", {"items": [{"name": "썸네일", "price": 30, "at": 1.0}]})
+    store.set("escrow_holds", "rps:1", {"1": 10})
+    store.reset()
+    assert store.get("user_points", "1") == 0
+    assert store.get("talent_store", "1", None)["items"][0]["name"] == "썸네일"
+    assert store.get("escrow_holds", "rps:1", None) == {"1": 10}
+
+
+def test_user_versions_track_only_rendered_sections(store):
+    before = store.version("1")
+    store.set("escrow_holds", "rps:1", {"1": 10})
+    store.delete("escrow_holds", "rps:1")
+    store.set("slot_quiet_channels", "42", True)
+    assert store.user_versions == {}
+    store.add("user_points", "1", 5)
+    assert store.version("1") != before
+
+
+def test_json_journal_replays_only_ops_after_the_snapshot(tmp_path):
+    data_path, journal_path = tmp_path / "data.json", tmp_path / "data.journal"
+    data_path.write_text(json.dumps({"user_points": {"1": 100}, "_seq": 2}), encoding="utf-8")
+    ops = [
+        {"o": "add", "k": "user_points", "u": "1", "v": 50, "s": 2},    # 스냅샷에 이미 포함
+        {"o": "add", "k": "user_points", "u": "1", "v": 7, "s": 3},
+        {"o": "set", "k": "usernames", "u": "1", "v": "솔라", "s": 4},
+        {"o": "del", "k": "user_points", "u": "2", "s": 5},
+        {"o": "add", "k": "slot_jackpot", "u": None, "v": 10, "s": 6},
+    ]
+    journal_path.write_text("".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops), encoding="utf-8")
+
+    data, seq, replayed = bot.JsonBackend(str(data_path), str(journal_path)).load()
+    assert seq == 6 and replayed == 4
+    assert data["user_points"] == {"1": 107}
+    assert data["usernames"] == {"1": "솔라"}
+    assert data["slot_jackpot"] == 10
+
+
+def test_store_recovers_committed_ops_after_a_crash(tmp_path):
+    def open_store():
+        store = bot.DataStore(bot.JsonBackend(str(tmp_path / "data.json"), str(tmp_path / "data.journal")))
+        store.load()
+        return store
+
+    async def write(store):
+        store.add("user_points", "1", 30)
+        store.set("usernames", "1", "솔라")
+        await store.sync()
+
+    store = open_store()
+    asyncio.run(write(store))
+    store._io.submit(store.backend.close).result()   # 스냅샷 없이 종료 (저널만 남음)
+
+    store = open_store()
+    assert store.get("user_points", "1") == 30
+    assert store.get("usernames", "1") == "솔라"
+    assert (tmp_path / "data.journal").stat().st_size == 0   # 복구 후 스냅샷으로 압축
+    store.close()
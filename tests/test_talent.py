@@ -0,0 +1,61 @@
+import asyncio
+import types
+
+import pytest
+
+import bot
+
+
+class FakeGuild:
+    id = 1
+
+    def __init__(self, missing=()):
+        self.lookups = []
+        self.missing = set(missing)
+
+    def get_member(self, member_id):
+        self.lookups.append(member_id)
+        if member_id in self.missing:
+            return None
+        return types.SimpleNamespace(display_name=f"판매자{member_id}")
+
+
+@pytest.fixture
+def listings(tmp_path):
+    bot.store.backend = bot.JsonBackend(str(tmp_path / "data.json"), str(tmp_path / "data.journal"))
+    bot.store.load()
+    for seller in ("1", "2", "3"):
+        for n in range(7):
+            bot.catalog.register(seller, f"썸네일 제작 {seller}-{n}", 10 + n)
+    bot.store.flush()
+
+
+def test_search_looks_each_seller_up_once(listings):
+    guild, sent = FakeGuild(missing={3}), []
+
+    async def send(*args, **kwargs):
+        sent.append(kwargs["embed"])
+
+    ctx = types.SimpleNamespace(
+        guild=guild, send=send, author=types.SimpleNamespace(id=9),
+        message=types.SimpleNamespace(content="!재능상점 검색 썸네일"),
+    )
+    asyncio.run(bot.재능상점.callback(ctx, "검색"))
+
+    assert sorted(guild.lookups) == [1, 2, 3]
+    assert sent[0].footer.text.startswith("상품 14개")
+
+
+def test_browse_looks_each_seller_up_once(listings):
+    guild, query = FakeGuild(), (None, None, None)
+    bot.talent_browser._rows.clear()
+    bot.talent_browser._pages.clear()
+
+    rows = bot.talent_browser.rows(guild, query)
+    assert len(rows) == 21 and len(guild.lookups) == 3
+
+    guild.lookups.clear()
+    embed = bot.talent_browser.page(guild, query, 1)
+    shown = rows[:bot.TALENT_PAGE_SIZE]
+    assert len(guild.lookups) == len({it.seller_id for it in shown})
+    assert embed.footer.text.startswith(f"1/{bot.talent_browser.page_count(guild, query)} 페이지 • 상품 21개")